@@ -0,0 +1,117 @@
+"""
+Concurrent read throughput while reflections are being written.
+
+Builds a throwaway SQLite database with the synthetic verses from
+benchmarks/fixtures.py and, for each journal mode, runs reader
+threads that issue the /surah verse query through the read-only pool, first
+with no writer and then while a writer commits reflections exactly like
+POST /reflection/add does.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_concurrent_reads [--seconds 5] [--readers 8]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+JOURNAL_MODES = ["DELETE", "WAL"]
+
+
+def run_phase(seconds, readers, with_writer):
+    from database import SessionLocal, ReadSessionLocal
+    from models import Ayat, Reflection
+
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0]
+
+    def reader(i):
+        rng = random.Random(i)
+        while not stop.is_set():
+            db = ReadSessionLocal()
+            try:
+                surah = rng.randint(1, 114)
+                db.query(Ayat).filter(Ayat.surah_number == surah).order_by(Ayat.ayat_number).all()
+            finally:
+                db.close()
+            reads[i] += 1
+
+    def writer():
+        while not stop.is_set():
+            db = SessionLocal()
+            try:
+                db.add(Reflection(ayat_id=random.randint(1, 6236), text_content="Tefekkür notu " * 10))
+                db.commit()
+            finally:
+                db.close()
+            writes[0] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    if with_writer:
+        threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {"reads_per_s": sum(reads) / seconds, "writes_per_s": writes[0] / seconds}
+
+
+def worker(seconds, readers):
+    """Runs inside a subprocess whose DATABASE_URL/SQLITE_JOURNAL_MODE are already set"""
+    from database import SessionLocal, engine, Base
+    from benchmarks.fixtures import seed_ayats
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_ayats(db, random.Random(1))
+    finally:
+        db.close()
+
+    result = {
+        "idle": run_phase(seconds, readers, with_writer=False),
+        "writing": run_phase(seconds, readers, with_writer=True),
+    }
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.seconds, args.readers)
+        return
+
+    print(f"{args.readers} readers, {args.seconds:g}s per phase")
+    print(f"{'journal':<8} {'reads/s idle':>14} {'reads/s writing':>16} {'writes/s':>10}")
+    for mode in JOURNAL_MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                SQLITE_JOURNAL_MODE=mode,
+            )
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_concurrent_reads", "--worker",
+                 "--seconds", str(args.seconds), "--readers", str(args.readers)],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:<8} {result['idle']['reads_per_s']:>14.0f} "
+              f"{result['writing']['reads_per_s']:>16.0f} {result['writing']['writes_per_s']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Latency benchmark for the hot endpoints, driven through the ASGI app.
+
+Builds the synthetic database from benchmarks/fixtures.py (no network), then
+requests each scenario repeatedly with the in-process test client and reports
+latency percentiles, throughput and SQL queries per request. Cached pages are
+measured twice: as page cache hits, and as "_render" scenarios that empty the
+page cache before every request, so changes to the render functions show up.
+
+Results can be saved as a baseline; later runs are compared against it and
+exit non-zero on any increase in queries per request, which doesn't depend on
+the machine, or on a p50 slowdown beyond --tolerance plus --slack-ms (which
+keeps millisecond scenarios from failing on noise). Record a new baseline
+in every change that makes an endpoint faster on purpose; a run well under
+the baseline says so.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_endpoints                  # compare with baseline
+    python -m benchmarks.bench_endpoints --save-baseline  # record a new baseline
+    python -m benchmarks.bench_endpoints --db /tmp/qpus-bench.db  # reuse a built db
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# (name, path, render): render=True empties the page cache before each request
+SCENARIOS = [
+    ("surah_short", "/surah/112", False),
+    ("surah_long", "/surah/2", False),
+    ("surah_long_render", "/surah/2", True),
+    ("verse_graph", "/verse-graph/2/255", False),
+    ("verse_graph_render", "/verse-graph/2/255", True),
+    ("favorites", "/favorites", False),
+    ("reflections", "/reflections", False),
+    ("concepts", "/concepts", False),
+    ("concepts_render", "/concepts", True),
+    ("concept_render", "/concept/1", True),
+]
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def run_scenario(client, counter, path, iterations, warmup, render=False):
+    from compression import page_cache
+
+    for _ in range(warmup):
+        client.get(path)
+
+    latencies = []
+    counter["queries"] = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if render:
+            page_cache.invalidate()
+        t0 = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - t0)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "rps": iterations / elapsed,
+        "queries_per_request": counter["queries"] / iterations,
+        "bytes": len(response.content),
+    }
+
+
+def compare(results, baseline, tolerance, slack_ms=0.0):
+    """Return a list of human readable regressions"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current["queries_per_request"] > base["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries/request {base['queries_per_request']:g} -> {current['queries_per_request']:g}"
+            )
+        if current["p50_ms"] > base["p50_ms"] * (1 + tolerance) + slack_ms:
+            regressions.append(f"{name}: p50 {base['p50_ms']:.1f} -> {current['p50_ms']:.1f} ms")
+    return regressions
+
+
+def stale(results, baseline, tolerance, slack_ms=0.0):
+    """Scenarios the baseline no longer describes: missing, or clearly beaten"""
+    notes = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            notes.append(f"{name}: not in the baseline")
+        elif current["queries_per_request"] < base["queries_per_request"]:
+            notes.append(
+                f"{name}: queries/request {base['queries_per_request']:g} -> {current['queries_per_request']:g}"
+            )
+        elif current["p50_ms"] * (1 + tolerance) ** 2 + slack_ms < base["p50_ms"]:
+            notes.append(f"{name}: p50 {base['p50_ms']:.1f} -> {current['p50_ms']:.1f} ms")
+    return notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot QPUS endpoints")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--db", help="SQLite file to use; built if it does not exist")
+    parser.add_argument("--only", nargs="*", help="scenario names to run")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="allowed p50 slowdown in ms on top of --tolerance")
+    args = parser.parse_args()
+
+    tmp = None
+    db_path = args.db
+    if db_path is None:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "bench.db")
+    needs_build = not os.path.exists(db_path)
+    # Must be set before database.py is imported anywhere
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+
+    if needs_build:
+        from benchmarks.fixtures import build_database
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = build_database()
+        print(f"Built synthetic database in {time.perf_counter() - started:.1f}s: {summary}")
+
+    from sqlalchemy import event
+    from fastapi.testclient import TestClient
+    from database import engine, read_engine
+    import main as app_module
+
+    # Without the context manager the lifespan (schema, import, warm-up) does not run
+    app_module.init_db()
+
+    counter = {"queries": 0}
+
+    def count_query(*_):
+        counter["queries"] += 1
+
+    for e in {engine, read_engine}:
+        event.listen(e, "after_cursor_execute", count_query)
+
+    client = TestClient(app_module.app)
+
+    results = {}
+    print(f"{'scenario':<20} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'queries':>8} {'KiB':>7}")
+    for name, path, render in SCENARIOS:
+        if args.only and name not in args.only:
+            continue
+        r = run_scenario(client, counter, path, args.iterations, args.warmup, render)
+        results[name] = r
+        print(f"{name:<20} {r['p50_ms']:>7.1f}ms {r['p95_ms']:>6.1f}ms {r['p99_ms']:>6.1f}ms "
+              f"{r['rps']:>8.1f} {r['queries_per_request']:>8.1f} {r['bytes'] / 1024:>7.1f}")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return
+
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        notes = stale(results, baseline, args.tolerance, args.slack_ms)
+        if notes:
+            print("Baseline is out of date (record it again with --save-baseline):")
+            for line in notes:
+                print(f"  {line}")
+        regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Startup benchmark: module import time and time to first request.
+
+Import time comes from `python -X importtime -c "import main"`, reported as
+the total plus the slowest first-party and third-party modules. Time to first
+request starts uvicorn on a free port against a fresh SQLite database and polls
+/api/status until it answers; it includes interpreter start, imports, schema
+creation and the lifespan. The import job is disabled (IMPORT_ON_STARTUP=0)
+so no network access is needed. Exits non-zero when the median time to first
+request exceeds --max-ms.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --max-ms 1000
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_PARTY = {
+    os.path.splitext(name)[0] for name in os.listdir(ROOT) if name.endswith(".py")
+} | {"routers"}
+
+
+def bench_env(db_path):
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "IMPORT_ON_STARTUP": "0",
+        "WARMUP_SURAHS": "0",
+        "PYTHONDONTWRITEBYTECODE": "0",
+    })
+    return env
+
+
+def import_times(env):
+    """Return (total_us, [(cumulative_us, module)]) for top-level imports of main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not cumulative.isdigit():
+            continue  # header
+        modules.append((int(cumulative), name))
+    total = next((us for us, name in modules if name == "main"), 0)
+    return total, modules
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_request(env, timeout=30.0):
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/status", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark QPUS startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    parser.add_argument("--max-ms", type=float, default=1000, help="allowed median time to first request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = bench_env(os.path.join(tmp, "startup.db"))
+
+        # The first run also writes bytecode caches, as a deploy's first boot would
+        import_times(env)
+        total, modules = import_times(env)
+        print(f"import main: {total / 1000:.0f} ms")
+        for label, first_party in (("first-party", True), ("third-party", False)):
+            top_level = {}
+            for us, name in modules:
+                root = name.split(".")[0]
+                if (root in FIRST_PARTY) == first_party and name != "main":
+                    top_level[root] = max(top_level.get(root, 0), us)
+            print(f"  slowest {label} modules:")
+            for root, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+                print(f"    {root:<24} {us / 1000:7.1f} ms")
+
+        runs = []
+        for i in range(args.runs):
+            # A fresh database each time, so schema creation is part of the measurement
+            db_path = os.path.join(tmp, f"startup-{i}.db")
+            runs.append(time_to_first_request(bench_env(db_path)))
+        median_ms = statistics.median(runs) * 1000
+        print(f"time to first request: median {median_ms:.0f} ms, "
+              f"min {min(runs) * 1000:.0f} ms, max {max(runs) * 1000:.0f} ms ({args.runs} runs)")
+
+    if median_ms > args.max_ms:
+        print(f"Slower than --max-ms {args.max_ms:.0f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Synthetic, fully populated database for benchmarks (no network access).
+
+Verse texts are generated with realistic lengths; relation tables, favorites
+and reflections are filled with deterministic pseudo-random rows. Concepts,
+reading flows, Mekki/Medeni flags and tafsir references use the real seed
+data through the import pipeline's apply functions.
+
+DATABASE_URL must point at the target database before this module is imported.
+"""
+import random
+
+from database import SessionLocal, engine, Base
+from models import Ayat, NuzulSebebi, Favorite, Reflection
+from import_mutashabihat import apply_mutashabihat_rows
+from import_qursim import apply_qursim_rows
+from import_translations import copy_builtin_translations
+from import_tafsir_refs import load_tafsir_rows, apply_tafsir_rows
+from seed_concepts import CONCEPTS, apply_concepts
+from seed_mekki_flows import READING_FLOWS, load_mekki_rows, apply_mekki_medeni, apply_reading_flows
+from utils import SURAH_AYAT_COUNTS, TOTAL_AYATS, absolute_number, absolute_to_surah_ayat
+
+ARABIC_WORDS = ["بِسْمِ", "اللَّهِ", "الرَّحْمَٰنِ", "الرَّحِيمِ", "الْحَمْدُ", "رَبِّ", "الْعَالَمِينَ", "مَالِكِ", "يَوْمِ", "الدِّينِ"]
+TURKISH_WORDS = ["Allah", "rahmet", "insan", "iman", "kalp", "yol", "gün", "hak", "söz", "kitap", "sabır", "nur"]
+
+
+def _text(rng, words, low, high):
+    return " ".join(rng.choice(words) for _ in range(rng.randint(low, high)))
+
+
+def _verse_pairs(rng, count):
+    # Uniform over verses rather than surahs, so short surahs aren't overloaded
+    pairs = set()
+    while len(pairs) < count:
+        pairs.add(absolute_to_surah_ayat(rng.randint(1, TOTAL_AYATS)) + absolute_to_surah_ayat(rng.randint(1, TOTAL_AYATS)))
+    return sorted(pairs)
+
+
+def seed_ayats(db, rng):
+    db.bulk_save_objects([
+        Ayat(
+            surah_number=surah,
+            ayat_number=ayat,
+            absolute_number=absolute_number(surah, ayat),
+            # Evenly spread stand-ins for the real mushaf divisions
+            page_number=(absolute_number(surah, ayat) - 1) * 604 // TOTAL_AYATS + 1,
+            hizb_quarter=(absolute_number(surah, ayat) - 1) * 240 // TOTAL_AYATS + 1,
+            arabic_text=_text(rng, ARABIC_WORDS, 5, 60),
+            translation_1=_text(rng, TURKISH_WORDS, 15, 120),
+            translation_2=_text(rng, TURKISH_WORDS, 10, 90),
+        )
+        for surah, count in enumerate(SURAH_AYAT_COUNTS, 1)
+        for ayat in range(1, count + 1)
+    ])
+    copy_builtin_translations(db)
+    db.commit()
+
+
+def build_database(seed=1, favorites=3000, reflections=5000, similar_pairs=4000, semantic_pairs=8000):
+    """Create all tables and fill them. Returns a summary dict of row counts."""
+    rng = random.Random(seed)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_ayats(db, rng)
+
+        db.bulk_save_objects([
+            NuzulSebebi(surah_number=s, ayat_number=a, text_en=_text(rng, TURKISH_WORDS, 40, 200))
+            for s, a, _, _ in _verse_pairs(rng, 600)
+        ])
+
+        keys = ["source_surah", "source_ayat", "target_surah", "target_ayat"]
+        apply_mutashabihat_rows(db, [dict(zip(keys, p)) for p in _verse_pairs(rng, similar_pairs)])
+        apply_qursim_rows(db, [
+            dict(zip(keys, p), similarity_degree=rng.choice([1, 2]))
+            for p in _verse_pairs(rng, semantic_pairs)
+        ])
+        apply_tafsir_rows(db, load_tafsir_rows())
+        apply_concepts(db, CONCEPTS)
+        apply_mekki_medeni(db, load_mekki_rows())
+        apply_reading_flows(db, READING_FLOWS)
+
+        db.bulk_save_objects([
+            Favorite(ayat_id=ayat_id)
+            for ayat_id in rng.sample(range(1, TOTAL_AYATS + 1), min(favorites, TOTAL_AYATS))
+        ])
+        db.bulk_save_objects([
+            Reflection(
+                ayat_id=rng.randint(1, TOTAL_AYATS),
+                text_content=_text(rng, TURKISH_WORDS, 10, 80),
+                concept_tag=rng.choice([None, "Sabır", "Rahmet", "Tevekkül"]),
+            )
+            for _ in range(reflections)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "ayats": TOTAL_AYATS,
+        "favorites": min(favorites, TOTAL_AYATS),
+        "reflections": reflections,
+        "similar_pairs": similar_pairs,
+        "semantic_pairs": semantic_pairs,
+    }
@@ -0,0 +1,161 @@
+"""
+Classify every verse's context_type (vaat, uyari, anlatim, emir, dua) offline.
+
+Each verse's Diyanet translation (translation_2) is scored against weighted
+Turkish stem lexicons: every word is looked up by its prefixes in one stem
+table, longest first, and counts for the longest stem it starts with only.
+Stems shorter than WHOLE_WORD_LENGTH match whole words ("isa" would match
+"isabet"). The category with the highest score wins (no label below
+MIN_SCORE). Verses are written back with one executemany UPDATE. A digest of
+the lexicon and the verse text is stored in ayat.context_digest, so a re-run
+only classifies verses whose translation or the lexicons changed.
+
+Classifying is the "context" stage of import_pipeline.py, scored in-process
+after the "quran" stage; the server's import job then resets the page cache
+that holds the context badges. Run by hand (in a process pool), it changes the
+database only; restart the server to show the new badges.
+
+Usage:
+    python classify_context.py          # classify new and changed verses
+    python classify_context.py --all    # classify every verse again
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import bindparam, select, update
+
+from sqlalchemy.orm import Session
+
+from models import Ayat
+
+# category -> {stem: weight}. Stems match any word they start, which covers
+# Turkish suffixes ("azab" matches "azabı", "azaptan" needs its own stem);
+# a longer stem only belongs here when it weighs differently ("rabbimiz").
+# Names are split from their suffixes at the apostrophe ("İsa'ya").
+LEXICONS = {
+    "vaat": {
+        "cennet": 3, "müjde": 3, "mükâfat": 3, "mükafat": 3, "ecir": 2, "ecri": 2, "ödül": 2,
+        "bağışla": 2, "mağfiret": 2, "rahmet": 1, "kurtuluş": 2, "nimet": 1,
+        "bahçe": 2, "ırmak": 2, "ebedî": 1, "ebedi": 1, "rızık": 1, "hoşnut": 2, "kazançlı": 1,
+    },
+    "uyari": {
+        "azab": 3, "azap": 3, "cehennem": 3, "ateş": 2, "helâk": 3, "helak": 3, "vay": 2,
+        "ceza": 2, "sakın": 2, "korkun": 2, "korkut": 2, "lanet": 2, "hüsran": 2, "ziyan": 1,
+        "inkâr": 1, "inkar": 1, "kâfir": 1, "kafir": 1, "zalim": 1, "elem": 1, "intikam": 2,
+    },
+    "anlatim": {
+        "hani": 3, "kıssa": 3, "haber": 1, "musa": 2, "firavun": 2, "ibrahim": 2, "nuh": 2,
+        "lût": 2, "lut": 2, "yusuf": 2, "isa": 2, "meryem": 2, "süleyman": 2, "davud": 2,
+        "salih": 2, "şuayb": 2, "kavm": 2, "dedi": 1, "demişti": 2,
+        "dediler": 1, "gönderdik": 1, "peygamber": 1,
+    },
+    "emir": {
+        "namaz": 2, "oruç": 2, "zekât": 2, "zekat": 2, "haram": 2, "helâl": 2, "helal": 2,
+        "farz": 2, "emreder": 2, "emrett": 2, "yasak": 2, "kılın": 2, "verin": 1, "yapmayın": 2,
+        "yaklaşmayın": 2, "boşan": 2, "miras": 2, "hac": 2, "hacc": 2, "kısas": 2, "borç": 1, "şahit": 1,
+        "abdest": 2, "yiyin": 1, "savaşın": 2,
+    },
+    "dua": {
+        "rabbimiz": 3, "rabbim": 2, "bağışla": 1, "dua": 2, "duala": 2, "duası": 2, "yalvar": 2,
+        "sığınırım": 3, "sığın": 1,
+    },
+}
+
+# Categories in tie-break order
+CATEGORIES = list(LEXICONS)
+MIN_SCORE = 2
+WHOLE_WORD_LENGTH = 4
+
+# Any change to the lexicons changes every digest, so everything is re-scored
+LEXICON_DIGEST = hashlib.sha256(
+    json.dumps([LEXICONS, MIN_SCORE, WHOLE_WORD_LENGTH], sort_keys=True).encode()
+).hexdigest()[:12]
+
+# stem -> [(category index, weight)], built once per process
+STEMS = {}
+for index, category in enumerate(CATEGORIES):
+    for stem, weight in LEXICONS[category].items():
+        STEMS.setdefault(stem, []).append((index, weight))
+MIN_STEM, MAX_STEM = min(map(len, STEMS)), max(map(len, STEMS))
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i", "Â": "â", "Î": "î", "Û": "û"})
+
+def turkish_words(text) -> list:
+    """Lowercased words of a Turkish text (dotted and dotless I kept apart)"""
+    return _WORD.findall((text or "").translate(_TURKISH_UPPER).lower())
+
+def context_digest(text) -> str:
+    return hashlib.sha256(f"{LEXICON_DIGEST}:{text or ''}".encode("utf-8")).hexdigest()[:16]
+
+def classify(text):
+    """The best scoring category for a translation, or None"""
+    scores = [0] * len(CATEGORIES)
+    for word in turkish_words(text):
+        for length in range(min(len(word), MAX_STEM), MIN_STEM - 1, -1):
+            if length < WHOLE_WORD_LENGTH and length < len(word):
+                break
+            matches = STEMS.get(word[:length])
+            if matches:
+                for index, weight in matches:
+                    scores[index] += weight
+                break
+    best = max(range(len(CATEGORIES)), key=lambda i: (scores[i], -i))
+    return CATEGORIES[best] if scores[best] >= MIN_SCORE else None
+
+def classify_chunk(verses):
+    """[(id, text)] -> [(id, context_type, digest)]; runs in a worker process"""
+    return [(ayat_id, classify(text), context_digest(text)) for ayat_id, text in verses]
+
+# Set by the CLI: score in a process pool and re-score every verse
+_cli = {"workers": None, "all": False}
+
+def load_context_rows():
+    """The lexicon digest and the digest of the verse texts; a change to either re-classifies"""
+    from import_pipeline import stage_digests
+    return [{"lexicon": LEXICON_DIGEST, "inputs": stage_digests(["quran"])}]
+
+def apply_context_types(db: Session, rows, chunk_size=500) -> str:
+    """Classify new and changed verses; the pipeline commits"""
+    started = time.perf_counter()
+    verses = db.execute(select(Ayat.id, Ayat.translation_2, Ayat.context_digest)).all()
+    pending = [
+        (ayat_id, text) for ayat_id, text, digest in verses
+        if _cli["all"] or digest != context_digest(text)
+    ]
+    if not pending:
+        return f"0 of {len(verses)} verses changed"
+
+    if _cli["workers"]:
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        with ProcessPoolExecutor(max_workers=_cli["workers"]) as pool:
+            results = [result for chunk in pool.map(classify_chunk, chunks) for result in chunk]
+    else:
+        results = classify_chunk(pending)
+
+    db.execute(
+        update(Ayat.__table__)
+        .where(Ayat.__table__.c.id == bindparam("_id"))
+        .values(context_type=bindparam("_type"), context_digest=bindparam("_digest")),
+        [{"_id": ayat_id, "_type": label, "_digest": digest} for ayat_id, label, digest in results],
+    )
+
+    counts = {}
+    for _, label, _ in results:
+        counts[label or "-"] = counts.get(label or "-", 0) + 1
+    summary = ", ".join(f"{label} {n}" for label, n in sorted(counts.items()))
+    return (f"classified {len(results)} of {len(verses)} verses in "
+            f"{time.perf_counter() - started:.1f}s ({summary})")
+
+def classify_corpus(reclassify_all=False, workers=None):
+    from import_pipeline import run_pipeline
+    _cli.update(workers=workers or os.cpu_count(), all=reclassify_all)
+    run_pipeline(["context"], force=True)
+
+if __name__ == "__main__":
+    classify_corpus(reclassify_all="--all" in sys.argv[1:])
@@ -0,0 +1,49 @@
+"""
+Write precompressed .gz (and .br, when brotli is installed) siblings next to
+every compressible file in static/, for PrecompressedStaticFiles to serve.
+Files are only rewritten when the source is newer than its variants.
+
+Usage: python compress_static.py [directory]
+"""
+import gzip
+import mimetypes
+import os
+import sys
+
+from compression import brotli, is_compressible, COMPRESSION_MIN_SIZE
+
+def compress_directory(directory="static"):
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith((".gz", ".br")):
+                continue
+            path = os.path.join(root, name)
+            content_type = mimetypes.guess_type(name)[0] or ""
+            if not is_compressible(content_type) or os.path.getsize(path) < COMPRESSION_MIN_SIZE:
+                continue
+
+            variants = {path + ".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli:
+                variants[path + ".br"] = lambda data: brotli.compress(data, quality=11)
+
+            mtime = os.path.getmtime(path)
+            with open(path, "rb") as f:
+                data = f.read()
+            for target, compress in variants.items():
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    continue
+                encoded = compress(data)
+                if len(encoded) >= len(data):
+                    if os.path.exists(target):
+                        os.remove(target)  # a stale variant would shadow the new source
+                    continue
+                with open(target, "wb") as f:
+                    f.write(encoded)
+                written += 1
+                print(f"{target}: {len(data)} -> {len(encoded)} bytes")
+    return written
+
+if __name__ == "__main__":
+    count = compress_directory(sys.argv[1] if len(sys.argv) > 1 else "static")
+    print(f"Wrote {count} precompressed files")
@@ -0,0 +1,263 @@
+"""
+Compressed response delivery.
+
+CompressionMiddleware encodes dynamic responses (br when the brotli package is
+installed, otherwise gzip) once they are above a size threshold. PageCache
+keeps rendered pages in their compressed form, so a cached page is compressed
+once rather than on every request. PrecompressedStaticFiles serves the .br/.gz
+siblings written by compress_static.py. Only URLs built by static_url(), which
+carry a hash of the file, are cached for STATIC_MAX_AGE; others revalidate.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import stat
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+# Dynamic responses are compressed per request, so keep these cheap
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Cached pages are compressed once and can afford a higher setting
+PAGE_GZIP_LEVEL = int(os.getenv("PAGE_GZIP_LEVEL", "9"))
+PAGE_BROTLI_QUALITY = int(os.getenv("PAGE_BROTLI_QUALITY", "9"))
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "256"))  # pages
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", str(30 * 24 * 3600)))  # seconds, versioned URLs only
+STATIC_DIR = "static"
+
+# Encodings we can produce, in order of preference
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+STATIC_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+def negotiate(accept_encoding: str, available=ENCODINGS):
+    """Pick the first of `available` that the Accept-Encoding header allows"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+class _Encoder:
+    """Incremental br/gzip encoder for streamed bodies"""
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.update, self._flush, self.finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 = gzip container
+            self.update, self.finish = compressor.compress, compressor.flush
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def chunk(self, data) -> bytes:
+        """Encode data and flush it, so a streamed chunk (an NDJSON line) reaches the client now"""
+        return self.update(data) + self._flush()
+
+class CompressionMiddleware:
+    """
+    Pure ASGI, so streamed responses are compressed chunk by chunk. Responses
+    that already carry a Content-Encoding (cached pages, precompressed static
+    files) and non-text types pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    "content-encoding" in headers
+                    or start["status"] < 200 or start["status"] in (204, 304)
+                    or not is_compressible(headers.get("content-type", ""))
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+
+                encoder = _Encoder(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = encoder.update(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    return await send({"type": "http.response.body", "body": body})
+                await send(start)
+
+            chunk = encoder.chunk(body) if more_body else encoder.update(body) + encoder.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+class CachedPage:
+    """A rendered page kept only in compressed form, plus its ETag"""
+
+    __slots__ = ("etag", "media_type", "encoded")
+
+    def __init__(self, body: bytes, media_type="text/html; charset=utf-8"):
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.media_type = media_type
+        self.encoded = {"gzip": gzip.compress(body, compresslevel=PAGE_GZIP_LEVEL, mtime=0)}
+        if brotli:
+            self.encoded["br"] = brotli.compress(body, quality=PAGE_BROTLI_QUALITY)
+
+    def response(self, request) -> Response:
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == self.etag:
+            return Response(status_code=304, headers=headers)
+        encoding = negotiate(request.headers.get("accept-encoding", ""), available=tuple(self.encoded))
+        if encoding is None:
+            # Rare (curl, some bots), so no plain copy is kept in memory
+            return Response(gzip.decompress(self.encoded["gzip"]), media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(self.encoded[encoding], media_type=self.media_type, headers=headers)
+
+class PageCache:
+    """
+    LRU of rendered pages keyed by tuples such as ("surah", 2). Pages that show
+    user state are invalidated by the handlers that write it; corpus pages only
+    change when the import pipeline runs.
+    """
+
+    def __init__(self, max_entries=PAGE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a render that started before it is not stored
+        self._generation = 0
+
+    def get_or_render(self, key, render) -> CachedPage:
+        """Return the cached page for key, rendering (render() -> str) on a miss"""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                return page
+            generation = self._generation
+
+        page = CachedPage(render().encode("utf-8"))
+        with self._lock:
+            if generation == self._generation and self.max_entries > 0:
+                self._pages[key] = page
+                while len(self._pages) > self.max_entries:
+                    self._pages.popitem(last=False)
+        return page
+
+    def invalidate(self, *prefix):
+        """Drop pages whose key starts with prefix; everything when called without one"""
+        with self._lock:
+            self._generation += 1
+            if not prefix:
+                self._pages.clear()
+                return
+            for key in [k for k in self._pages if k[:len(prefix)] == prefix]:
+                del self._pages[key]
+
+page_cache = PageCache()
+
+@lru_cache(maxsize=None)
+def _file_version(path, mtime) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=6).hexdigest()
+
+def static_url(path: str) -> str:
+    """/static URL of a file with a hash of its content, so it can be cached for STATIC_MAX_AGE"""
+    full_path = os.path.join(STATIC_DIR, path)
+    try:
+        version = _file_version(full_path, os.path.getmtime(full_path))
+    except OSError:
+        return f"/static/{path}"
+    return f"/static/{path}?v={version}"
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that prefers a .br/.gz sibling of the requested file"""
+
+    async def get_response(self, path, scope):
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), available=("br", "gzip"))
+        response = None
+        if encoding:
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path + STATIC_SUFFIXES[encoding]
+            )
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=media_type,
+                    headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+                )
+                if self.is_not_modified(response.headers, Headers(scope=scope)):
+                    response = Response(status_code=304, headers={
+                        k: v for k, v in response.headers.items() if k in ("etag", "vary")
+                    })
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            # Without a version the file may change under the same URL
+            versioned = b"v=" in scope.get("query_string", b"")
+            response.headers["Cache-Control"] = (
+                f"public, max-age={STATIC_MAX_AGE}, immutable" if versioned else "no-cache"
+            )
+        return response
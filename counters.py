@@ -0,0 +1,70 @@
+"""
+Row counts maintained on write.
+
+Each counter is bumped in the same transaction as the insert or delete it
+counts. Counters are kept per user, named "<counter>:<user id>". A missing
+counter (a new database, a new user, or rows loaded in bulk by the benchmark
+fixtures) is seeded with one COUNT(*) over the user's rows on first read.
+
+Version counters count writes instead of rows: bump() adds one on every write,
+so a process holding a copy of the user's rows knows when another wrote them.
+"""
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import IS_SQLITE
+from models import Counter, Favorite, Reflection
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert
+else:
+    from sqlalchemy.dialects.postgresql import insert
+
+# Counter -> counted model
+COUNTED = {
+    "favorites": Favorite,
+    "reflections": Reflection,
+}
+
+def counter_name(name: str, user_id: int) -> str:
+    return f"{name}:{user_id}"
+
+def increment(db: Session, name: str, user_id: int, delta: int = 1):
+    """Adjust a user's counter; committed together with the caller's next commit"""
+    db.query(Counter).filter(Counter.name == counter_name(name, user_id)).update(
+        {Counter.value: Counter.value + delta}, synchronize_session=False
+    )
+
+def bump(db: Session, name: str, user_id: int) -> int:
+    """Add one to a user's version counter (created at 1) and return the new value"""
+    return db.execute(
+        insert(Counter).values(name=counter_name(name, user_id), value=1)
+        .on_conflict_do_update(index_elements=["name"], set_={"value": Counter.value + 1})
+        .returning(Counter.value)
+    ).scalar_one()
+
+def get_version(db: Session, name: str, user_id: int) -> int:
+    """A user's version counter; 0 before the first write"""
+    return db.query(Counter.value).filter(Counter.name == counter_name(name, user_id)).scalar() or 0
+
+def get_count(db: Session, name: str, user_id: int) -> int:
+    value = db.query(Counter.value).filter(Counter.name == counter_name(name, user_id)).scalar()
+    if value is None:
+        value = recount(db, name, user_id)
+    return value
+
+def recount(db: Session, name: str, user_id: int) -> int:
+    """Reset a user's counter from COUNT(*) and return it"""
+    model = COUNTED[name]
+    value = db.query(func.count(model.id)).filter(model.user_id == user_id).scalar()
+    key = counter_name(name, user_id)
+    updated = db.query(Counter).filter(Counter.name == key).update({Counter.value: value})
+    if not updated:
+        try:
+            with db.begin_nested():
+                db.add(Counter(name=key, value=value))
+        except IntegrityError:
+            pass  # a concurrent request seeded it
+    db.commit()
+    return value
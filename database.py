@@ -1,20 +1,84 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
+def _normalize_url(url):
+    # Railway requires postgresql:// but SQLAlchemy uses postgresql+psycopg2://
+    if url and url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg2://", 1)
+    return url
+
 # Use SQLite for local development by default, or DATABASE_URL if set (e.g. for Railway)
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./qpus.db")
+DATABASE_URL = _normalize_url(os.getenv("DATABASE_URL", "sqlite:///./qpus.db"))
+
+# Optional read replica (e.g. a Postgres hot standby) that serves GET traffic
+DATABASE_REPLICA_URL = _normalize_url(os.getenv("DATABASE_REPLICA_URL"))
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# Engine profile, overridable per deployment
+# Postgres pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# SQLite pragmas
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # safe with WAL
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
+def _set_sqlite_pragmas(dbapi_connection, read_only):
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        # journal_mode is persistent in the file, the writer sets it once per connection
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")  # negative = KiB
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+def create_app_engine(url=DATABASE_URL, read_only=False):
+    """Create an engine with the deployment's pool/pragma profile"""
+    if url.startswith("sqlite"):
+        options = {"connect_args": {"check_same_thread": False}}
+        if read_only:
+            options.update(pool_size=SQLITE_READ_POOL_SIZE, max_overflow=0)
+        new_engine = create_engine(url, **options)
+
+        @event.listens_for(new_engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            _set_sqlite_pragmas(dbapi_connection, read_only)
 
-# Railway requires postgresql:// but SQLAlchemy uses postgresql+psycopg2://
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+psycopg2://", 1)
+        return new_engine
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        execution_options={"postgresql_readonly": True} if read_only else {},
+    )
+
+engine = create_app_engine()
+
+# Readers get their own pool so page views never queue behind a writing request.
+# In-memory SQLite databases are per-connection, so they have to share the engine.
+if DATABASE_REPLICA_URL:
+    read_engine = create_app_engine(DATABASE_REPLICA_URL, read_only=True)
+elif IS_SQLITE and ":memory:" not in DATABASE_URL and DATABASE_URL.rstrip("/") != "sqlite:":
+    read_engine = create_app_engine(read_only=True)
+else:
+    read_engine = engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
@@ -24,3 +88,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """
+    Session for corpus reads (ayats, relations, concepts, flows), bound to the
+    replica or read-only pool. User state that a handler has just written
+    (favorites, reflections, preferences) must be read through get_db instead,
+    since a replica may lag behind the primary.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
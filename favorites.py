@@ -0,0 +1,103 @@
+"""
+Favorite verses as in-memory bitmaps, one per user.
+
+One bit per verse, indexed by Ayat.absolute_number (6,236 bits, under 1 KB),
+loaded from the user's favorites on first use and updated by toggle() after
+each commit, so rendering a surah needs no favorites query. Bitmaps of the
+most recently active users are kept in a users.PerUserCache.
+
+Every toggle bumps the user's "favorite_writes" version counter. A read checks
+it with one primary-key lookup and reloads the bitmap when another worker
+toggled since it was loaded.
+"""
+import threading
+
+from sqlalchemy.orm import Session
+
+from counters import bump, get_version, increment
+from database import IS_SQLITE
+from models import Ayat, Favorite
+from users import PerUserCache
+from utils import TOTAL_AYATS
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert
+else:
+    from sqlalchemy.dialects.postgresql import insert
+
+class FavoriteBitmap:
+    def __init__(self, user_id, size=TOTAL_AYATS):
+        self.user_id = user_id
+        self._size = size
+        self._bits = None
+        self._version = None
+        self._lock = threading.RLock()
+
+    def _ensure_current(self, db: Session):
+        version = get_version(db, VERSION_COUNTER, self.user_id)
+        if self._bits is not None and self._version == version:
+            return
+        with self._lock:
+            if self._bits is None or self._version != version:
+                # Read after the version: a toggle in between only causes another reload
+                bits = bytearray((self._size + 8) // 8)
+                for (number,) in (
+                    db.query(Ayat.absolute_number).join(Favorite, Favorite.ayat_id == Ayat.id)
+                    .filter(Favorite.user_id == self.user_id)
+                ):
+                    if number:
+                        bits[number >> 3] |= 1 << (number & 7)
+                self._bits, self._version = bits, version
+
+    def contains(self, db: Session, number) -> bool:
+        self._ensure_current(db)
+        return bool(number) and bool(self._bits[number >> 3] & (1 << (number & 7)))
+
+    def numbers_between(self, db: Session, first, last) -> tuple:
+        """The favorite absolute numbers from first to last"""
+        self._ensure_current(db)
+        bits = self._bits
+        return tuple(n for n in range(first, last + 1) if bits[n >> 3] & (1 << (n & 7)))
+
+    def set(self, number, value: bool, version: int):
+        """Apply this process's toggle, which stored `version`"""
+        with self._lock:
+            if self._bits is None or not number:
+                return  # loaded with the current state on first use
+            if self._version != version - 1:
+                self._bits = None  # another worker toggled too; reload on next read
+                return
+            self._version = version
+            if value:
+                self._bits[number >> 3] |= 1 << (number & 7)
+            else:
+                self._bits[number >> 3] &= ~(1 << (number & 7)) & 0xFF
+
+VERSION_COUNTER = "favorite_writes"
+
+favorite_bits = PerUserCache(FavoriteBitmap)
+
+def toggle(db: Session, user_id: int, ayat_id: int, absolute_number) -> bool:
+    """
+    Remove the verse from the user's favorites, or add it if it wasn't one,
+    and commit. Returns True if the verse is now a favorite. The unique
+    (user_id, ayat_id) index makes a concurrent double-click unable to store
+    the verse twice.
+    """
+    bits = favorite_bits.get(user_id)
+    with bits._lock:
+        removed = db.query(Favorite).filter(
+            Favorite.user_id == user_id, Favorite.ayat_id == ayat_id
+        ).delete(synchronize_session=False)
+        if removed:
+            increment(db, "favorites", user_id, -removed)
+        else:
+            added = db.execute(
+                insert(Favorite).values(user_id=user_id, ayat_id=ayat_id)
+                .on_conflict_do_nothing(index_elements=["user_id", "ayat_id"])
+            ).rowcount
+            increment(db, "favorites", user_id, added)
+        version = bump(db, VERSION_COUNTER, user_id)
+        db.commit()
+        bits.set(absolute_number, not removed, version)
+    return not removed
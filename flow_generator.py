@@ -0,0 +1,196 @@
+"""
+Reading flows generated from the relation graph.
+
+A flow starts at a seed verse (or at a concept's seed verses) and walks the
+similar/theme/tefsir edges of ayat_reference and the verses sharing a
+concept. Candidates collect the weight of their edges to every verse picked
+so far; each step takes the best candidate after a diversity penalty for
+surahs already visited and for verses next to one already picked, so a flow
+travels across the Qur'an instead of reading one passage in order.
+
+The adjacency index is built in memory with one query per edge table on
+first use and again after an import, like mushaf.boundaries, so a flow takes
+milliseconds. Generated flows are never stored: they are unsaved ReadingFlow
+objects rendered into the page cache under a key holding graph.generation,
+so a rebuilt graph leads to new pages and the cache bounds their number.
+"""
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import (
+    Ayat, Concept, ReadingFlow, ReadingFlowStep,
+    ayat_concept_association as ayat_concept, ayat_reference_association as reference,
+    REFERENCE_SIMILAR, REFERENCE_THEME, REFERENCE_TAFSIR,
+)
+from utils import SURAH_NAMES
+
+FLOW_LENGTH, MIN_FLOW_LENGTH, MAX_FLOW_LENGTH = 12, 5, 20
+
+# Edge weights; theme edges weigh their degree, concept links their confidence
+EDGE_WEIGHTS = {REFERENCE_SIMILAR: 2.0, REFERENCE_TAFSIR: 3.0}
+CONCEPT_WEIGHT = 1.5
+# Verses of the flow's own concept stay ahead of the rest of the graph
+FOCUS_WEIGHT = 4.0
+# Diversity: per verse already taken from the same surah, and for a verse
+# within NEAR_DISTANCE of one already taken
+SURAH_PENALTY = 1.5
+NEAR_PENALTY, NEAR_DISTANCE = 3.0, 3
+
+QUESTIONS = {
+    REFERENCE_SIMILAR: "Bu ayet {ref} ile benzer ifadeler kullanıyor. Aynı sözler burada neyi vurguluyor?",
+    REFERENCE_THEME: "{ref} ile bu ayet aynı konuya hangi farklı açılardan bakıyor?",
+    REFERENCE_TAFSIR: "{mufassir}, bu ayeti {ref} ile birlikte açıklar. Bu bağlantı size ne düşündürüyor?",
+    "concept": "Bu ayet '{concept}' kavramına hangi yönden ışık tutuyor?",
+}
+FIRST_QUESTION = "Bu ayeti okurken zihninizde beliren ilk soru nedir?"
+
+class RelationGraph:
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+        # Bumped on every reset; part of the page cache key of generated flows
+        self.generation = 0
+
+    def _load(self, db: Session) -> dict:
+        index = self._index
+        if index is not None:
+            return index
+        with self._lock:
+            if self._index is None:
+                verses = {ayat_id: (surah, ayat) for ayat_id, surah, ayat in
+                          db.execute(select(Ayat.id, Ayat.surah_number, Ayat.ayat_number))}
+                # ayat id -> [(other id, weight, relation, mufassir)], both directions
+                edges = {}
+                for source_id, target_id, reference_type, degree, mufassir in db.execute(select(
+                    reference.c.source_ayat_id, reference.c.target_ayat_id,
+                    reference.c.reference_type, reference.c.degree, reference.c.mufassir,
+                )):
+                    weight = float(degree or 1) if reference_type == REFERENCE_THEME else EDGE_WEIGHTS.get(reference_type, 1.0)
+                    edges.setdefault(source_id, []).append((target_id, weight, reference_type, mufassir))
+                    edges.setdefault(target_id, []).append((source_id, weight, reference_type, mufassir))
+                concepts, members = {}, {}
+                for ayat_id, concept_id, confidence in db.execute(
+                    select(ayat_concept.c.ayat_id, ayat_concept.c.concept_id, ayat_concept.c.confidence)
+                ):
+                    concepts.setdefault(ayat_id, []).append(concept_id)
+                    members.setdefault(concept_id, []).append((ayat_id, confidence))
+                self._index = {
+                    "verses": verses, "edges": edges, "concepts": concepts, "members": members,
+                    "concept_names": dict(db.execute(select(Concept.id, Concept.name)).all()),
+                }
+            return self._index
+
+    def walk(self, db: Session, start_id, length=FLOW_LENGTH, focus=None) -> list:
+        """
+        [(ayat id, question)] for a flow of up to length verses from start_id.
+        focus is a concept id whose verses are preferred throughout.
+        """
+        index = self._load(db)
+        verses, edges, concepts, members = index["verses"], index["edges"], index["concepts"], index["members"]
+        if start_id not in verses:
+            return []
+
+        score, reason = {}, {}  # candidate -> summed weight, strongest (weight, question)
+        def offer(ayat_id, weight, question):
+            score[ayat_id] = score.get(ayat_id, 0.0) + weight
+            if weight > reason.get(ayat_id, (0.0, None))[0]:
+                reason[ayat_id] = (weight, question)
+        if focus is not None:
+            focus_question = QUESTIONS["concept"].format(concept=index["concept_names"].get(focus, ""))
+            for ayat_id, confidence in members.get(focus, ()):
+                offer(ayat_id, FOCUS_WEIGHT * confidence, focus_question)
+
+        flow, taken, per_surah = [], set(), {}
+        current, question = start_id, FIRST_QUESTION
+        while current is not None:
+            flow.append((current, question))
+            taken.add(current)
+            score.pop(current, None)
+            surah, ayat = verses[current]
+            per_surah.setdefault(surah, []).append(ayat)
+            if len(flow) >= length:
+                break
+
+            ref = f"{SURAH_NAMES.get(surah, surah)} {surah}:{ayat}"
+            for other, weight, relation, mufassir in edges.get(current, ()):
+                if other not in taken:
+                    offer(other, weight, QUESTIONS[relation].format(ref=ref, mufassir=mufassir or "Müfessirler"))
+            for concept_id in concepts.get(current, ()):
+                concept_question = QUESTIONS["concept"].format(concept=index["concept_names"].get(concept_id, ""))
+                for other, confidence in members.get(concept_id, ()):
+                    if other not in taken:
+                        offer(other, CONCEPT_WEIGHT * confidence, concept_question)
+
+            def ranked(ayat_id):
+                other_surah, other_ayat = verses[ayat_id]
+                picked = per_surah.get(other_surah, ())
+                penalty = SURAH_PENALTY * len(picked)
+                if any(abs(other_ayat - n) <= NEAR_DISTANCE for n in picked):
+                    penalty += NEAR_PENALTY
+                return score[ayat_id] - penalty, -ayat_id
+            current = max((a for a in score if a in verses), key=ranked, default=None)
+            question = reason[current][1] if current is not None else None
+        return flow
+
+    def reset(self):
+        """
+        Rebuild the index on next use. main.run_initial_import calls this after
+        the import job, whose concept_tags stage re-tags the corpus; a manual
+        tag_concepts.py run is only seen after a restart.
+        """
+        with self._lock:
+            self._index = None
+            self.generation += 1
+
+graph = RelationGraph()
+
+def flow_length(steps) -> int:
+    return min(max(steps or FLOW_LENGTH, MIN_FLOW_LENGTH), MAX_FLOW_LENGTH)
+
+def generated_flow(db: Session, title, description, start_id, length, focus=None):
+    """An unsaved ReadingFlow walked from start_id, with its verses loaded in one query"""
+    steps = graph.walk(db, start_id, length, focus)
+    if not steps:
+        return None
+    ayats = {ayat.id: ayat for ayat in db.query(Ayat).filter(Ayat.id.in_([ayat_id for ayat_id, _ in steps]))}
+    return ReadingFlow(title=title, description=description, steps=[
+        ReadingFlowStep(order=i, ayat_id=ayat_id, ayat=ayats[ayat_id], reflection_question=question)
+        for i, (ayat_id, question) in enumerate(steps, 1)
+    ])
+
+def verse_flow(db: Session, surah_number, ayat_number, steps=None):
+    length = flow_length(steps)
+    start_id = db.execute(select(Ayat.id).where(
+        Ayat.surah_number == surah_number, Ayat.ayat_number == ayat_number
+    )).scalar()
+    if start_id is None:
+        return None
+    return generated_flow(
+        db,
+        f"{SURAH_NAMES.get(surah_number, surah_number)} {surah_number}:{ayat_number} Ayetinden Yola Çıkarak",
+        "Benzer ifadeler, ortak konular, tefsir bağlantıları ve kavramlar üzerinden otomatik oluşturulan okuma akışı.",
+        start_id, length,
+    )
+
+def concept_flow(db: Session, concept_id, steps=None):
+    length = flow_length(steps)
+    concept = db.get(Concept, concept_id)
+    if concept is None:
+        return None
+    # Start at the concept's first seed verse in mushaf order
+    start_id = db.execute(
+        select(Ayat.id).join(ayat_concept, ayat_concept.c.ayat_id == Ayat.id)
+        .where(ayat_concept.c.concept_id == concept_id)
+        .order_by(ayat_concept.c.confidence.desc(), Ayat.absolute_number)
+        .limit(1)
+    ).scalar()
+    if start_id is None:
+        return None
+    return generated_flow(
+        db,
+        f"{concept.name} Üzerine Okuma",
+        f"{concept.definition or concept.name} Kavramın ayetleri ve ilişki ağı üzerinden otomatik oluşturulan okuma akışı.",
+        start_id, length, focus=concept_id,
+    )
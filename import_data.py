@@ -1,8 +1,8 @@
-import requests
-import time
+import re
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine
+from database import engine
 from models import Ayat, Base
+from utils import absolute_number
 
 import sys
 
@@ -10,6 +10,7 @@ import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
 def get_translation_ids():
+    import requests  # only needed when the corpus is downloaded
     print("Fetching translation resource IDs...")
     url = "https://api.quran.com/api/v4/resources/translations?language=tr"
     response = requests.get(url)
@@ -38,96 +39,76 @@ def get_translation_ids():
                 
     return elmalili_id, diyanet_id
 
-def import_data_from_api():
-    db: Session = SessionLocal()
+def clean_html(raw_html):
+    return re.sub(r'<.*?>', '', raw_html)
+
+def load_quran_rows():
+    """Fetch every verse with both translations. Returns None if any chapter fails."""
+    import requests
+    elm_id, diy_id = get_translation_ids()
+    print(f"Selected Translation IDs - Elmalili: {elm_id}, Diyanet: {diy_id}")
     
-    # Check if data exists
-    if db.query(Ayat).count() > 0:
-        print("Data already exists. Skipping.")
-        return
+    if not elm_id or not diy_id:
+        print("Could not find suitable translation IDs. Aborting.")
+        return None
 
-    try:
-        elm_id, diy_id = get_translation_ids()
-        print(f"Selected Translation IDs - Elmalili: {elm_id}, Diyanet: {diy_id}")
+    rows = []
+    
+    print("Starting import chapter by chapter...")
+    for chapter in range(1, 115):
+        print(f"Fetching Chapter {chapter}...")
+        # Fetch all verses for the chapter
+        # limit=300 covers all surahs (Baqarah is 286)
+        url = f"https://api.quran.com/api/v4/verses/by_chapter/{chapter}"
+        params = {
+            "language": "en",
+            "words": "false",
+            "translations": f"{elm_id},{diy_id}",
+            "fields": "text_uthmani",
+            "limit": 300,
+            "per_page": 300
+        }
         
-        if not elm_id or not diy_id:
-            print("Could not find suitable translation IDs. Aborting.")
-            return
-
-        ayats_to_insert = []
+        response = requests.get(url, params=params)
         
-        print("Starting import chapter by chapter...")
-        for chapter in range(1, 115):
-            print(f"Fetching Chapter {chapter}...")
-            # Fetch all verses for the chapter
-            # limit=300 covers all surahs (Baqarah is 286)
-            url = f"https://api.quran.com/api/v4/verses/by_chapter/{chapter}"
-            params = {
-                "language": "en",
-                "words": "false",
-                "translations": f"{elm_id},{diy_id}",
-                "fields": "text_uthmani",
-                "limit": 300,
-                "per_page": 300
-            }
+        if response.status_code != 200:
+            # A partial corpus would make the diff delete verses, so give up
+            print(f"Error fetching chapter {chapter}: {response.text}")
+            return None
             
-            response = requests.get(url, params=params)
+        for v in response.json()['verses']:
+            # Map translations by resource_id
+            trans_map = {t['resource_id']: t['text'] for t in v['translations']}
             
-            if response.status_code != 200:
-                print(f"Error fetching chapter {chapter}: {response.text}")
-                continue
-                
-            data = response.json()
-            verses = data['verses']
-            
-            for v in verses:
-                verse_number = v['verse_number']
-                text_uthmani = v['text_uthmani']
-                
-                translations = v['translations']
-                # Map translations by resource_id
-                trans_map = {t['resource_id']: t['text'] for t in translations}
-                
-                t1 = trans_map.get(elm_id, "")
-                t2 = trans_map.get(diy_id, "")
-                
+            rows.append({
+                "surah_number": chapter,
+                "ayat_number": v['verse_number'],
+                "arabic_text": v['text_uthmani'],
                 # Clean up text if needed (sometimes HTML tags in translations)
-                import re
-                def clean_html(raw_html):
-                    cleanr = re.compile('<.*?>')
-                    return re.sub(cleanr, '', raw_html)
+                "translation_1": clean_html(trans_map.get(elm_id, "")),
+                "translation_2": clean_html(trans_map.get(diy_id, "")),
+                "page_number": v.get('page_number'),
+                "hizb_quarter": v.get('rub_el_hizb_number'),
+            })
 
-                t1 = clean_html(t1)
-                t2 = clean_html(t2)
+    print(f"Total Ayats fetched: {len(rows)}")
+    
+    # Verify count (should be 6236)
+    if len(rows) != 6236:
+        print(f"WARNING: Expected 6236 ayats, got {len(rows)}")
+    return rows
 
-                ayat = Ayat(
-                    surah_number=chapter,
-                    ayat_number=verse_number,
-                    arabic_text=text_uthmani,
-                    translation_1=t1,
-                    translation_2=t2
-                )
-                ayats_to_insert.append(ayat)
-            
-            # Sleep briefly to be nice to API
-            # time.sleep(0.2)
+def apply_quran_rows(db: Session, rows):
+    """Update verses in place so ayat ids referenced by favorites/reflections stay stable"""
+    from import_pipeline import sync_table
+    from import_translations import copy_builtin_translations
+    rows = [dict(row, absolute_number=absolute_number(row["surah_number"], row["ayat_number"])) for row in rows]
+    summary = sync_table(db, Ayat.__table__, ["surah_number", "ayat_number"], rows)
+    return f"{summary}; {copy_builtin_translations(db)}"
 
-        print(f"Total Ayats fetched: {len(ayats_to_insert)}")
-        
-        # Verify count (should be 6236)
-        if len(ayats_to_insert) != 6236:
-            print(f"WARNING: Expected 6236 ayats, got {len(ayats_to_insert)}")
-        
-        print("Inserting into database...")
-        db.bulk_save_objects(ayats_to_insert)
-        db.commit()
-        print("Import completed successfully!")
-
-    except Exception as e:
-        print(f"Error: {e}")
-        db.rollback()
-    finally:
-        db.close()
+def import_data_from_api():
+    from import_pipeline import run_pipeline
+    run_pipeline(["quran"], force=True)
 
 if __name__ == "__main__":
     Base.metadata.create_all(bind=engine)
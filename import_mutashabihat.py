@@ -2,64 +2,13 @@
 Import Mutashabihat (Similar Verses) data from Waqar144/Quran_Mutashabihat_Data
 This data helps identify verses that are similar in wording (useful for memorization)
 """
-import requests
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine, Base
-from models import Ayat
+from models import REFERENCE_SIMILAR
+from utils import absolute_to_surah_ayat
 
-# Association table for similar verses
-from sqlalchemy import Column, Integer, String, Table, ForeignKey
-from database import Base
-
-similar_ayat_association = Table(
-    "similar_ayat",
-    Base.metadata,
-    Column("id", Integer, primary_key=True, autoincrement=True),
-    Column("source_surah", Integer, nullable=False),
-    Column("source_ayat", Integer, nullable=False),
-    Column("target_surah", Integer, nullable=False),
-    Column("target_ayat", Integer, nullable=False),
-)
-
-# Surah ayat counts for converting absolute ayah number to surah:ayah
-SURAH_AYAT_COUNTS = [
-    7, 286, 200, 176, 120, 165, 206, 75, 129, 109, 123, 111, 43, 52, 99, 128, 111,
-    110, 98, 135, 112, 78, 118, 64, 77, 227, 93, 88, 69, 60, 34, 30, 73, 54, 45,
-    83, 182, 88, 75, 85, 54, 53, 89, 59, 37, 35, 38, 29, 18, 45, 60, 49, 62, 55,
-    78, 96, 29, 22, 24, 13, 14, 11, 11, 18, 12, 12, 30, 52, 52, 44, 28, 28, 20,
-    56, 40, 31, 50, 40, 46, 42, 29, 19, 36, 25, 22, 17, 19, 26, 30, 20, 15, 21,
-    11, 8, 8, 19, 5, 8, 8, 11, 11, 8, 3, 9, 5, 4, 7, 3, 6, 3, 5, 4, 5, 6
-]
-
-def absolute_to_surah_ayat(absolute_num):
-    """Convert absolute ayah number (1-6236) to (surah, ayat)"""
-    cumulative = 0
-    for surah_idx, count in enumerate(SURAH_AYAT_COUNTS):
-        if cumulative + count >= absolute_num:
-            return (surah_idx + 1, absolute_num - cumulative)
-        cumulative += count
-    return (114, absolute_num - cumulative)
-
-def import_mutashabihat():
-    """Import similar verses data"""
-    db: Session = SessionLocal()
-    
-    # Check if table exists and has data
-    try:
-        from sqlalchemy import inspect
-        inspector = inspect(engine)
-        if 'similar_ayat' in inspector.get_table_names():
-            result = db.execute("SELECT COUNT(*) FROM similar_ayat").fetchone()
-            if result[0] > 0:
-                print("Similar verses data already exists. Skipping.")
-                db.close()
-                return
-    except:
-        pass
-    
-    # Create table if not exists
-    similar_ayat_association.create(engine, checkfirst=True)
-    
+def load_mutashabihat_rows():
+    """Download similar verse pairs. Returns None if the download fails."""
+    import requests  # only needed when the source is downloaded
     print("Downloading Mutashabihat data...")
     url = "https://raw.githubusercontent.com/Waqar144/Quran_Mutashabihat_Data/master/mutashabiha_data.json"
     
@@ -69,11 +18,10 @@ def import_mutashabihat():
         data = response.json()
     except Exception as e:
         print(f"Error downloading data: {e}")
-        db.close()
-        return
+        return None
     
     print("Processing similar verses...")
-    total_pairs = 0
+    rows = []
     
     for juz_key, entries in data.items():
         for entry in entries:
@@ -99,21 +47,23 @@ def import_mutashabihat():
                     continue
                 
                 target_surah, target_ayat = absolute_to_surah_ayat(target_ayah)
-                
-                # Insert the relationship
-                db.execute(
-                    similar_ayat_association.insert().values(
-                        source_surah=src_surah,
-                        source_ayat=src_ayat,
-                        target_surah=target_surah,
-                        target_ayat=target_ayat
-                    )
-                )
-                total_pairs += 1
+                rows.append({
+                    "source_surah": src_surah,
+                    "source_ayat": src_ayat,
+                    "target_surah": target_surah,
+                    "target_ayat": target_ayat,
+                })
     
-    db.commit()
-    print(f"Imported {total_pairs} similar verse pairs.")
-    db.close()
+    return rows
+
+def apply_mutashabihat_rows(db: Session, rows):
+    from import_pipeline import sync_references
+    return sync_references(db, REFERENCE_SIMILAR, rows)
+
+def import_mutashabihat():
+    """Import similar verses data"""
+    from import_pipeline import run_pipeline
+    run_pipeline(["mutashabihat"], force=True)
 
 if __name__ == "__main__":
     import_mutashabihat()
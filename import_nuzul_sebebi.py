@@ -2,62 +2,59 @@
 Import Nuzul Sebebi (Asbab al-Nuzul) data from spa5k/tafsir_api
 Source: Al-Wahidi's Asbab al-Nuzul (English translation)
 """
-import requests
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine, Base
-from models import NuzulSebebi, Ayat
+from database import engine, Base
+from models import NuzulSebebi
 
 BASE_URL = "https://raw.githubusercontent.com/spa5k/tafsir_api/main/tafsir/en-asbab-al-nuzul-by-al-wahidi"
 
-def import_nuzul_sebebi():
-    """Import revelation reasons from Al-Wahidi"""
-    db: Session = SessionLocal()
-    
-    # Check if data exists
-    if db.query(NuzulSebebi).count() > 0:
-        print("Nuzul Sebebi data already exists. Skipping.")
-        db.close()
-        return
+def load_nuzul_rows():
+    """Download revelation reasons from Al-Wahidi. Returns None on network errors."""
+    import requests  # only needed when the source is downloaded
+    print("Downloading Asbab al-Nuzul (Nuzul Sebebi) data...")
     
-    print("Importing Asbab al-Nuzul (Nuzul Sebebi) data...")
-    
-    total_imported = 0
+    rows = []
     
     for surah in range(1, 115):
         url = f"{BASE_URL}/{surah}.json"
         
         try:
             response = requests.get(url, timeout=30)
-            if response.status_code != 200:
-                print(f"  Surah {surah}: No data available")
-                continue
-            
-            data = response.json()
-            ayahs = data.get("ayahs", [])
-            
-            for ayah_data in ayahs:
-                ayat_num = ayah_data.get("ayah")
-                text = ayah_data.get("text", "")
-                
-                if text and text.strip():
-                    ns = NuzulSebebi(
-                        surah_number=surah,
-                        ayat_number=ayat_num,
-                        text_en=text.strip(),
-                        source="Al-Wahidi"
-                    )
-                    db.add(ns)
-                    total_imported += 1
-            
-            db.commit()
-            print(f"  Surah {surah}: {len(ayahs)} entries")
-            
         except Exception as e:
+            # Don't let a flaky connection delete the entries of this surah
             print(f"  Error fetching surah {surah}: {e}")
+            return None
+        
+        if response.status_code == 404:
+            print(f"  Surah {surah}: No data available")
             continue
+        if response.status_code != 200:
+            # A 5xx or 429 is not "no data": keep the stored entries
+            print(f"  Error fetching surah {surah}: HTTP {response.status_code}")
+            return None
+        
+        ayahs = response.json().get("ayahs", [])
+        for ayah_data in ayahs:
+            text = ayah_data.get("text", "")
+            if text and text.strip():
+                rows.append({
+                    "surah_number": surah,
+                    "ayat_number": ayah_data.get("ayah"),
+                    "text_en": text.strip(),
+                    "source": "Al-Wahidi",
+                })
     
-    print(f"Nuzul Sebebi import completed. Total entries: {total_imported}")
-    db.close()
+    print(f"Nuzul Sebebi download completed. Total entries: {len(rows)}")
+    return rows
+
+def apply_nuzul_rows(db: Session, rows):
+    from import_pipeline import sync_table
+    return sync_table(db, NuzulSebebi.__table__, ["surah_number", "ayat_number"], rows)
+
+def import_nuzul_sebebi():
+    """Import revelation reasons from Al-Wahidi"""
+    from import_pipeline import run_pipeline
+    run_pipeline(["nuzul"], force=True)
 
 if __name__ == "__main__":
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,287 @@
+"""
+Incremental import pipeline.
+
+Every stage loads its source data, hashes it and compares the digest with the
+one stored in the import_stage table. Unchanged stages are skipped; changed
+stages apply only the row diff (new, changed and vanished rows), so a single
+new row in data/tafsir_refs.csv or a new flow in READING_FLOWS reaches an existing
+database, and a half-finished import is repaired on the next run.
+
+Remote stages (anything downloaded from the internet) are only fetched when
+they have never completed, or when a refresh is requested explicitly.
+
+Usage:
+    python import_pipeline.py                 # run stages whose data changed
+    python import_pipeline.py --refresh       # also re-download remote sources
+    python import_pipeline.py --force tafsir  # re-apply a stage unconditionally
+"""
+import hashlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, engine, Base, DATABASE_URL
+from migrations import run_migrations
+from models import Ayat, ImportStage, ayat_reference_association
+from utils import absolute_number
+
+# SQLite allows one writer at a time; downloads still run concurrently
+_write_lock = threading.Lock() if "sqlite" in DATABASE_URL else nullcontext()
+
+
+class Stage:
+    """One unit of the import pipeline"""
+
+    def __init__(self, name, load, apply, remote=False, after=()):
+        self.name = name
+        self.load = load      # () -> rows, or None if the source is unavailable
+        self.apply = apply    # (db, rows) -> short summary string
+        self.remote = remote
+        self.after = tuple(after)
+
+
+def compute_digest(rows) -> str:
+    payload = json.dumps(rows, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def sync_table(db: Session, table, key_columns, rows, scope=None):
+    """
+    Make `table` match `rows` (a list of dicts) keyed by `key_columns`:
+    insert missing keys, update changed values, delete keys that vanished
+    from the source as well as duplicate rows left by older imports.
+    `scope` ({column: value}) limits the sync to the rows of one source in a
+    shared table and is written into inserted rows.
+    Returns an "+inserted ~updated -deleted" summary.
+    """
+    scope = scope or {}
+    source = {tuple(row[c] for c in key_columns): row for row in rows}
+    value_columns = [c for c in (rows[0] if rows else {}) if c not in key_columns]
+    n_keys = len(key_columns)
+
+    existing = {}
+    duplicates = []
+    columns = [table.c.id] + [table.c[c] for c in list(key_columns) + value_columns]
+    query = select(*columns).where(*[table.c[c] == value for c, value in scope.items()])
+    for row in db.execute(query):
+        key = tuple(row[1:1 + n_keys])
+        if key in existing:
+            duplicates.append(row[0])
+        else:
+            existing[key] = (row[0], tuple(row[1 + n_keys:]))
+
+    inserts = [dict(row, **scope) for key, row in source.items() if key not in existing]
+    updates = [
+        {"_id": existing[key][0], **{f"v_{c}": row[c] for c in value_columns}}
+        for key, row in source.items()
+        if key in existing and existing[key][1] != tuple(row[c] for c in value_columns)
+    ]
+    deletes = [row_id for key, (row_id, _) in existing.items() if key not in source] + duplicates
+
+    if inserts:
+        db.execute(table.insert(), inserts)
+    if updates:
+        db.execute(
+            table.update()
+            .where(table.c.id == bindparam("_id"))
+            .values({c: bindparam(f"v_{c}") for c in value_columns}),
+            updates,
+        )
+    for i in range(0, len(deletes), 500):
+        db.execute(table.delete().where(table.c.id.in_(deletes[i:i + 500])))
+
+    return f"+{len(inserts)} ~{len(updates)} -{len(deletes)}"
+
+
+def stage_digests(names) -> dict:
+    """
+    {stage: digest} of the named stages' last applied data. Stages derived
+    from other stages' rows (concept tags, context types) put this in their
+    own rows, so they run again whenever an input changed.
+    """
+    db = SessionLocal()
+    try:
+        return dict(db.execute(select(ImportStage.name, ImportStage.digest).where(ImportStage.name.in_(names))).all())
+    finally:
+        db.close()
+
+
+def ayat_ids(db: Session, refs) -> dict:
+    """Resolve (surah, ayat) pairs to ayat ids with one query on absolute_number"""
+    numbers = {absolute_number(s, a): (s, a) for s, a in refs}
+    numbers.pop(None, None)
+    ids = {}
+    for i in range(0, len(numbers), 500):
+        chunk = list(numbers)[i:i + 500]
+        for ayat_id, number in db.execute(select(Ayat.id, Ayat.absolute_number).where(Ayat.absolute_number.in_(chunk))):
+            ids[numbers[number]] = ayat_id
+    return ids
+
+
+def sync_references(db: Session, reference_type, rows, key_columns=()):
+    """
+    Sync one reference_type of the ayat_reference edge table. `rows` carry
+    source_surah/source_ayat/target_surah/target_ayat plus any edge columns
+    (degree, mufassir, note); `key_columns` are the edge columns that are part
+    of the key. Pairs whose verses aren't in the corpus are skipped.
+    """
+    refs = {(r["source_surah"], r["source_ayat"]) for r in rows} | {(r["target_surah"], r["target_ayat"]) for r in rows}
+    ids = ayat_ids(db, refs)
+    if rows and not ids:
+        # Storing the digest now would keep these edges out until the source changes
+        raise RuntimeError("Quran corpus not imported yet")
+
+    position_columns = ("source_surah", "source_ayat", "target_surah", "target_ayat")
+    edges = []
+    for r in rows:
+        source_id = ids.get((r["source_surah"], r["source_ayat"]))
+        target_id = ids.get((r["target_surah"], r["target_ayat"]))
+        if source_id and target_id:
+            edge = {"source_ayat_id": source_id, "target_ayat_id": target_id}
+            edge.update((c, v) for c, v in r.items() if c not in position_columns)
+            edges.append(edge)
+
+    return sync_table(
+        db, ayat_reference_association, ["source_ayat_id", "target_ayat_id", *key_columns], edges,
+        scope={"reference_type": reference_type},
+    )
+
+
+def get_stages():
+    """All pipeline stages, in declaration order"""
+    from import_data import load_quran_rows, apply_quran_rows
+    from seed_concepts import CONCEPTS, apply_concepts
+    from seed_mekki_flows import (
+        READING_FLOWS, load_mekki_rows, apply_mekki_medeni, apply_reading_flows
+    )
+    from import_nuzul_sebebi import load_nuzul_rows, apply_nuzul_rows
+    from import_mutashabihat import load_mutashabihat_rows, apply_mutashabihat_rows
+    from import_qursim import load_qursim_rows, apply_qursim_rows
+    from import_tafsir_refs import load_tafsir_rows, apply_tafsir_rows
+    from import_translations import load_translation_rows, apply_translation_rows
+    from classify_context import load_context_rows, apply_context_types
+    from tag_concepts import TAGGING_INPUTS, load_tagging_rows, apply_concept_tags
+
+    return [
+        Stage("quran", load_quran_rows, apply_quran_rows, remote=True),
+        Stage("translations", load_translation_rows, apply_translation_rows, remote=True, after=["quran"]),
+        Stage("concepts", lambda: CONCEPTS, apply_concepts, after=["quran"]),
+        Stage("mekki", load_mekki_rows, apply_mekki_medeni, after=["quran"]),
+        Stage("reading_flows", lambda: READING_FLOWS, apply_reading_flows, after=["quran"]),
+        Stage("nuzul", load_nuzul_rows, apply_nuzul_rows, remote=True),
+        # Cross-references are stored by ayat id, so they need the corpus first
+        Stage("mutashabihat", load_mutashabihat_rows, apply_mutashabihat_rows, remote=True, after=["quran"]),
+        Stage("qursim", load_qursim_rows, apply_qursim_rows, remote=True, after=["quran"]),
+        Stage("tafsir", load_tafsir_rows, apply_tafsir_rows, after=["quran"]),
+        Stage("context", load_context_rows, apply_context_types, after=["quran"]),
+        # Derived from the stages above; their digests are part of its rows
+        Stage("concept_tags", load_tagging_rows, apply_concept_tags, after=TAGGING_INPUTS),
+    ]
+
+
+def run_stage(stage: Stage, force=False, refresh_remote=False) -> dict:
+    """Load, diff and apply a single stage. Returns a result record."""
+    started = time.perf_counter()
+    result = {"stage": stage.name, "status": "skipped", "detail": ""}
+
+    db: Session = SessionLocal()
+    try:
+        record = db.get(ImportStage, stage.name)
+        if stage.remote and record and not (force or refresh_remote):
+            result["detail"] = "remote source already imported"
+            return result
+
+        rows = stage.load()
+        if rows is None:
+            result["status"] = "failed"
+            result["detail"] = "source unavailable"
+            return result
+
+        digest = compute_digest(rows)
+        if record and record.digest == digest and not force:
+            result["detail"] = "unchanged"
+            return result
+
+        with _write_lock:
+            result["detail"] = stage.apply(db, rows) or ""
+            if record is None:
+                record = ImportStage(name=stage.name)
+                db.add(record)
+            record.digest = digest
+            record.row_count = len(rows)
+            record.duration_ms = int((time.perf_counter() - started) * 1000)
+            db.commit()
+        result["status"] = "applied"
+    except Exception as e:
+        db.rollback()
+        result["status"] = "failed"
+        result["detail"] = str(e)
+    finally:
+        db.close()
+        result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def run_pipeline(names=None, force=False, refresh_remote=False, progress=None) -> list:
+    """
+    Run the selected stages (all by default). Stages without dependencies run
+    concurrently; a stage listed in another stage's `after` must succeed first.
+    `progress(percent, detail)` is called as each stage finishes.
+    """
+    stages = get_stages()
+    if names:
+        stages = [s for s in stages if s.name in names]
+    selected = {s.name for s in stages}
+
+    # The CLI may run against a fresh database
+    Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+    started = time.perf_counter()
+    futures = {}
+
+    def run_after_dependencies(stage):
+        for dep in stage.after:
+            if dep in futures and futures[dep].result()["status"] == "failed":
+                return {"stage": stage.name, "status": "failed",
+                        "detail": f"dependency '{dep}' failed", "seconds": 0.0}
+        return run_stage(stage, force=force, refresh_remote=refresh_remote)
+
+    finished = []
+
+    def report(future):
+        result = future.result()
+        finished.append(result["stage"])
+        if progress:
+            progress(100 * len(finished) // len(stages), f"{result['stage']}: {result['status']}")
+
+    with ThreadPoolExecutor(max_workers=max(len(stages), 1)) as pool:
+        # Dependencies are declared before their dependents, so their futures exist
+        for stage in stages:
+            missing = [dep for dep in stage.after if dep not in selected]
+            if missing and not names:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}")
+            futures[stage.name] = pool.submit(run_after_dependencies, stage)
+            futures[stage.name].add_done_callback(report)
+        results = [futures[s.name].result() for s in stages]
+
+    print("Import pipeline:")
+    for r in results:
+        print(f"  {r['stage']:<14} {r['status']:<8} {r['seconds']:7.2f}s  {r['detail']}")
+    print(f"  total{'':<18} {time.perf_counter() - started:7.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run_pipeline(
+        names=[a for a in args if not a.startswith("--")] or None,
+        force="--force" in args,
+        refresh_remote="--refresh" in args,
+    )
@@ -1,45 +1,23 @@
 """
 Import QurSim Semantic Similarity data from sabdul111/QursimMultilingual
 Uses Turkish translation (tr.diyanet.xlsx) which contains verse similarity pairs
+
+Set QURSIM_SAMPLE=1 to bootstrap an offline database with the known pairs of
+sample_semantic_rows() instead; they replace every stored theme edge.
 """
-import requests
 import io
-from sqlalchemy import Column, Integer, String, Table
+import os
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine, Base
+from models import REFERENCE_THEME
 
-# Create semantic similarity table
-semantic_similarity = Table(
-    "semantic_similarity",
-    Base.metadata,
-    Column("id", Integer, primary_key=True, autoincrement=True),
-    Column("source_surah", Integer, nullable=False),
-    Column("source_ayat", Integer, nullable=False),
-    Column("target_surah", Integer, nullable=False),
-    Column("target_ayat", Integer, nullable=False),
-    Column("similarity_degree", Integer, nullable=True),  # 2=strong, 1=weak, 0=none
-)
+QURSIM_SAMPLE = os.getenv("QURSIM_SAMPLE") == "1"
 
-def import_qursim():
-    """Import QurSim semantic similarity data from XLSX"""
-    db: Session = SessionLocal()
-    
-    # Check if table exists and has data
-    try:
-        from sqlalchemy import inspect
-        inspector = inspect(engine)
-        if 'semantic_similarity' in inspector.get_table_names():
-            result = db.execute("SELECT COUNT(*) FROM semantic_similarity").fetchone()
-            if result[0] > 0:
-                print("QurSim data already exists. Skipping.")
-                db.close()
-                return
-    except Exception as e:
-        print(f"Check error: {e}")
-    
-    # Create table if not exists
-    semantic_similarity.create(engine, checkfirst=True)
-    
+def load_qursim_rows():
+    """Download and parse QurSim similarity pairs. Returns None on errors."""
+    if QURSIM_SAMPLE:
+        print("Using sample semantic pairs from known related verses (QURSIM_SAMPLE=1)...")
+        return sample_semantic_rows()
+    import requests  # only needed when the source is downloaded
     print("Downloading QurSim data (tr.diyanet.xlsx)...")
     url = "https://raw.githubusercontent.com/sabdul111/QursimMultilingual/main/Qursim%2084%20Holy%20Quran%20Translations/tr.diyanet.xlsx"
     
@@ -53,14 +31,11 @@ def import_qursim():
         ws = wb.active
         
         print("Parsing XLSX file...")
-        total_pairs = 0
-        seen_pairs = set()
+        rows = {}
         
         # QurSim format: each row has source and related verses
         # Typically: Surah1, Ayat1, Text1, Surah2, Ayat2, Text2, Similarity
-        rows = list(ws.iter_rows(min_row=2, values_only=True))  # Skip header
-        
-        for row in rows:
+        for row in ws.iter_rows(min_row=2, values_only=True):  # Skip header
             if len(row) < 5:
                 continue
             
@@ -76,35 +51,39 @@ def import_qursim():
                 if src_surah and src_ayat and tgt_surah and tgt_ayat:
                     # Avoid duplicates
                     pair_key = (src_surah, src_ayat, tgt_surah, tgt_ayat)
-                    if pair_key not in seen_pairs:
-                        seen_pairs.add(pair_key)
-                        db.execute(
-                            semantic_similarity.insert().values(
-                                source_surah=src_surah,
-                                source_ayat=src_ayat,
-                                target_surah=tgt_surah,
-                                target_ayat=tgt_ayat,
-                                similarity_degree=similarity
-                            )
-                        )
-                        total_pairs += 1
+                    rows.setdefault(pair_key, {
+                        "source_surah": src_surah,
+                        "source_ayat": src_ayat,
+                        "target_surah": tgt_surah,
+                        "target_ayat": tgt_ayat,
+                        "similarity_degree": similarity
+                    })
             except (ValueError, TypeError):
                 continue
         
-        db.commit()
         wb.close()
-        print(f"Imported {total_pairs} semantic similarity pairs from QurSim.")
+        print(f"Parsed {len(rows)} semantic similarity pairs from QurSim.")
+        return list(rows.values())
         
     except Exception as e:
+        # A partial or sample set would make the diff delete the real edges
         print(f"Error importing QurSim: {e}")
-        # Try alternative: create some sample semantic pairs based on known related verses
-        print("Creating sample semantic pairs from known related verses...")
-        create_sample_semantic_pairs(db)
-    
-    db.close()
+        return None
+
+def apply_qursim_rows(db: Session, rows):
+    from import_pipeline import sync_references
+    return sync_references(db, REFERENCE_THEME, [
+        {**{c: r[c] for c in r if c != "similarity_degree"}, "degree": r["similarity_degree"]}
+        for r in rows
+    ])
+
+def import_qursim():
+    """Import QurSim semantic similarity data from XLSX"""
+    from import_pipeline import run_pipeline
+    run_pipeline(["qursim"], force=True)
 
-def create_sample_semantic_pairs(db):
-    """Create sample semantic pairs from known related verses"""
+def sample_semantic_rows():
+    """Sample semantic pairs from known related verses"""
     # Known semantically related verse pairs (from Islamic scholarship)
     known_pairs = [
         # Creation of Adam
@@ -151,25 +130,16 @@ def create_sample_semantic_pairs(db):
         (23, 1, 8, 2, 2),    # Mu'minun 1 - Anfal 2
     ]
     
-    total = 0
-    for src_s, src_a, tgt_s, tgt_a, sim in known_pairs:
-        try:
-            db.execute(
-                semantic_similarity.insert().values(
-                    source_surah=src_s,
-                    source_ayat=src_a,
-                    target_surah=tgt_s,
-                    target_ayat=tgt_a,
-                    similarity_degree=sim
-                )
-            )
-            total += 1
-        except:
-            pass
-    
-    db.commit()
-    print(f"Created {total} sample semantic pairs.")
+    return [
+        {
+            "source_surah": src_s,
+            "source_ayat": src_a,
+            "target_surah": tgt_s,
+            "target_ayat": tgt_a,
+            "similarity_degree": sim
+        }
+        for src_s, src_a, tgt_s, tgt_a, sim in known_pairs
+    ]
 
 if __name__ == "__main__":
-    Base.metadata.create_all(bind=engine)
     import_qursim()
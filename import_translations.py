@@ -0,0 +1,104 @@
+"""
+Translations stored in ayat_translation, one row per verse and translation.
+
+The built-in translations come with the corpus: the "quran" stage keeps
+ayat.translation_1 (Elmalılı) and ayat.translation_2 (Diyanet) and copies
+them here with copy_builtin_translations(). Any number of further
+translations are downloaded from quran.com by the "translations" stage,
+listed by resource id in IMPORT_TRANSLATIONS (e.g. "77,52"). The stage is
+remote, so after changing the list run:
+
+    python import_pipeline.py --refresh translations
+"""
+import os
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Ayat, Translation, ayat_translation_association as ayat_translation
+
+IMPORT_TRANSLATIONS = [int(i) for i in os.getenv("IMPORT_TRANSLATIONS", "").split(",") if i.strip().isdigit()]
+
+# key -> the ayat column holding the text, in display order
+BUILTIN_TRANSLATIONS = [
+    {"key": "elmalili", "name": "Elmalılı Hamdi Yazır", "language": "tr", "column": "translation_1"},
+    {"key": "diyanet", "name": "Diyanet İşleri", "language": "tr", "column": "translation_2"},
+]
+
+def ensure_translation(db: Session, key, name, language, position) -> int:
+    """Create or update a translation by key. Returns its id."""
+    translation = db.query(Translation).filter(Translation.key == key).first()
+    if translation is None:
+        translation = Translation(key=key)
+        db.add(translation)
+    translation.name, translation.language, translation.position = name, language, position
+    db.flush()
+    return translation.id
+
+def sync_translation(db: Session, translation_id, texts) -> str:
+    """Make the rows of one translation match texts ({ayat_id: text})"""
+    from import_pipeline import sync_table
+    rows = [{"ayat_id": ayat_id, "text": text} for ayat_id, text in texts.items() if text]
+    return sync_table(db, ayat_translation, ["ayat_id"], rows, scope={"translation_id": translation_id})
+
+def copy_builtin_translations(db: Session) -> str:
+    summaries = []
+    for position, builtin in enumerate(BUILTIN_TRANSLATIONS):
+        translation_id = ensure_translation(db, builtin["key"], builtin["name"], builtin["language"], position)
+        texts = dict(db.execute(select(Ayat.id, getattr(Ayat, builtin["column"]))).all())
+        summaries.append(f"{builtin['key']} {sync_translation(db, translation_id, texts)}")
+    return ", ".join(summaries)
+
+def load_translation_rows():
+    """One row per translation in IMPORT_TRANSLATIONS with all its verses, or None on a failed download"""
+    if not IMPORT_TRANSLATIONS:
+        return []
+    import requests
+    from import_data import clean_html
+
+    response = requests.get(
+        "https://api.quran.com/api/v4/resources/translations", params={"language": "tr"}, timeout=30
+    )
+    response.raise_for_status()
+    resources = {item["id"]: item for item in response.json()["translations"]}
+
+    verses = {resource_id: [] for resource_id in IMPORT_TRANSLATIONS}
+    for chapter in range(1, 115):
+        print(f"Fetching translations of chapter {chapter}...")
+        response = requests.get(f"https://api.quran.com/api/v4/verses/by_chapter/{chapter}", params={
+            "words": "false",
+            "translations": ",".join(map(str, IMPORT_TRANSLATIONS)),
+            "per_page": 300,
+        }, timeout=30)
+        if response.status_code != 200:
+            print(f"Error fetching chapter {chapter}: {response.text}")
+            return None
+        for v in response.json()["verses"]:
+            for t in v["translations"]:
+                if t["resource_id"] in verses:
+                    verses[t["resource_id"]].append(
+                        {"surah": chapter, "ayat": v["verse_number"], "text": clean_html(t["text"])}
+                    )
+
+    return [
+        {
+            "key": f"qurancom-{resource_id}",
+            "name": resources.get(resource_id, {}).get("name", f"quran.com {resource_id}"),
+            "language": resources.get(resource_id, {}).get("language_name"),
+            "verses": verses[resource_id],
+        }
+        for resource_id in IMPORT_TRANSLATIONS
+    ]
+
+def apply_translation_rows(db: Session, rows):
+    from import_pipeline import ayat_ids
+    ids = ayat_ids(db, {(v["surah"], v["ayat"]) for row in rows for v in row["verses"]})
+    if rows and not ids:
+        raise RuntimeError("Quran corpus not imported yet")
+
+    summaries = []
+    for position, row in enumerate(rows, len(BUILTIN_TRANSLATIONS)):
+        translation_id = ensure_translation(db, row["key"], row["name"], row["language"], position)
+        texts = {ids[(v["surah"], v["ayat"])]: v["text"] for v in row["verses"] if (v["surah"], v["ayat"]) in ids}
+        summaries.append(f"{row['key']} {sync_translation(db, translation_id, texts)}")
+    return ", ".join(summaries) or "no translations listed"
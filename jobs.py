@@ -0,0 +1,143 @@
+"""
+In-process background jobs.
+
+Jobs run one at a time on a worker thread (SQLite allows a single writer)
+while the app is already serving. Their status and progress are kept in the
+job table, so /api/status can report that the app is still warming up.
+
+The job table is shared by every replica. Each process touches heartbeat_at
+of its unfinished jobs every JOB_HEARTBEAT seconds, and a starting process
+only marks jobs interrupted once their heartbeat is JOB_STALE_AFTER old, so
+a replica booting next to a running import leaves it alone.
+"""
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+
+from database import SessionLocal
+from models import Job
+
+JOB_HEARTBEAT = int(os.getenv("JOB_HEARTBEAT", "30"))  # seconds
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "120"))  # seconds without a heartbeat
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def _update(job_id, **values):
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id).update(dict(values, heartbeat_at=_now()), synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+class JobRunner:
+    def __init__(self):
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qpus-job")
+        # Jobs whose process stopped without finishing them no longer get a heartbeat
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(
+                Job.status.in_(["queued", "running"]),
+                func.coalesce(Job.heartbeat_at, Job.created_at) < _now() - timedelta(seconds=JOB_STALE_AFTER),
+            ).update({"status": "interrupted", "finished_at": _now()}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        self._stopped.clear()
+        threading.Thread(target=self._heartbeat, name="qpus-job-heartbeat", daemon=True).start()
+
+    def _heartbeat(self):
+        while not self._stopped.wait(JOB_HEARTBEAT):
+            with self._lock:
+                job_ids = [job_id for job_id, future in self._futures.items() if not future.done()]
+            if job_ids:
+                try:
+                    db = SessionLocal()
+                    try:
+                        db.query(Job).filter(Job.id.in_(job_ids)).update(
+                            {"heartbeat_at": _now()}, synchronize_session=False
+                        )
+                        db.commit()
+                    finally:
+                        db.close()
+                except Exception:
+                    traceback.print_exc()  # a busy database; try again on the next beat
+
+    def submit(self, name, func) -> int:
+        """
+        Queue func(report) and return the job id. func may call
+        report(percent, detail) to record progress; its return value is
+        stored as the job's final detail.
+        """
+        db = SessionLocal()
+        try:
+            job = Job(name=name, status="queued", progress=0, heartbeat_at=_now())
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+
+        with self._lock:
+            self._futures[job_id] = self._executor.submit(self._run, job_id, func)
+        return job_id
+
+    def _run(self, job_id, func):
+        _update(job_id, status="running", started_at=_now())
+
+        def report(percent, detail=None):
+            _update(job_id, progress=int(percent), detail=detail)
+
+        try:
+            result = func(report)
+        except Exception as e:
+            traceback.print_exc()
+            _update(job_id, status="failed", detail=f"{type(e).__name__}: {e}", finished_at=_now())
+        else:
+            _update(job_id, status="done", progress=100,
+                    detail=None if result is None else str(result), finished_at=_now())
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._executor:
+            # A running import can't be interrupted; don't block shutdown on it
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+runner = JobRunner()
+
+def _alive():
+    """Unfinished jobs whose process still beats, in any replica"""
+    return (
+        Job.status.in_(["queued", "running"]),
+        func.coalesce(Job.heartbeat_at, Job.created_at) >= _now() - timedelta(seconds=JOB_STALE_AFTER),
+    )
+
+def jobs_active(db) -> bool:
+    """True while any replica has a job queued or running"""
+    return db.query(Job.id).filter(*_alive()).first() is not None
+
+def recent_jobs(db, limit=10) -> list:
+    jobs = db.query(Job).order_by(Job.id.desc()).limit(limit).all()
+    return [
+        {
+            "id": job.id,
+            "name": job.name,
+            "status": job.status,
+            "progress": job.progress,
+            "detail": job.detail,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+        }
+        for job in jobs
+    ]
@@ -1,107 +1,105 @@
+import os
+import time
 from fastapi import FastAPI, Depends
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
-from database import engine, Base, get_db, SessionLocal
-import models
-from routers import web_routes, concepts, reading_flows
+from sqlalchemy import text
+from database import engine, read_engine, Base, get_db
+import models  # registers every table on Base.metadata
+from migrations import run_migrations
+import jobs
+import warmup
+from visits import visits
+import mushaf
+import flow_generator
+import translations
+from compression import CompressionMiddleware, PrecompressedStaticFiles, STATIC_DIR, page_cache
+from templating import env as template_env
+from routers import web_routes, concepts, reading_flows, chronological, divisions, accounts, api
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Extra replicas can leave the import to one instance
+IMPORT_ON_STARTUP = os.getenv("IMPORT_ON_STARTUP", "1") == "1"
 
-def run_initial_import():
-    """Run data import if database is empty"""
-    from models import Ayat
-    db = SessionLocal()
+def init_db():
+    """Create tables, then bring older databases up to the current schema"""
+    Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+def run_initial_import(report):
+    """Bring the database up to date with the import pipeline (a background job)"""
+    from import_pipeline import run_pipeline
     try:
-        ayat_count = db.query(Ayat).count()
-        if ayat_count == 0:
-            print("Database is empty. Running initial data import...")
-            
-            # Import Quran data
-            try:
-                from import_data import import_quran_data
-                import_quran_data()
-                print("Quran data import completed.")
-            except Exception as e:
-                print(f"Error importing Quran data: {e}")
-            
-            # Import concepts
-            try:
-                from seed_concepts import seed_concepts
-                seed_concepts()
-                print("Concepts seeding completed.")
-            except Exception as e:
-                print(f"Error seeding concepts: {e}")
-            
-            # Import Mekki/Medeni and reading flows
-            try:
-                from seed_mekki_flows import seed_mekki_medeni, seed_reading_flows
-                seed_mekki_medeni()
-                seed_reading_flows()
-                print("Mekki/Medeni and reading flows completed.")
-            except Exception as e:
-                print(f"Error seeding Mekki/flows: {e}")
-            
-            # Import Nuzul Sebebi (Asbab al-Nuzul)
-            try:
-                from import_nuzul_sebebi import import_nuzul_sebebi
-                import_nuzul_sebebi()
-                print("Nuzul Sebebi import completed.")
-            except Exception as e:
-                print(f"Error importing Nuzul Sebebi: {e}")
-            
-            # Import Mutashabihat (Similar Verses)
-            try:
-                from import_mutashabihat import import_mutashabihat
-                import_mutashabihat()
-                print("Mutashabihat import completed.")
-            except Exception as e:
-                print(f"Error importing Mutashabihat: {e}")
-            
-            # Import QurSim Semantic Similarity
-            try:
-                from import_qursim import import_qursim
-                import_qursim()
-                print("QurSim import completed.")
-            except Exception as e:
-                print(f"Error importing QurSim: {e}")
-            
-            # Import Tafsir References
-            try:
-                from import_tafsir_refs import import_tafsir_refs
-                import_tafsir_refs()
-                print("Tafsir references import completed.")
-            except Exception as e:
-                print(f"Error importing Tafsir refs: {e}")
-        else:
-            print(f"Database has {ayat_count} ayats. Skipping import.")
+        results = run_pipeline(progress=report)
     finally:
-        db.close()
+        # Cached pages may show corpus rows the pipeline just changed
+        page_cache.invalidate()
+        mushaf.boundaries.reset()
+        flow_generator.graph.reset()
+        translations.catalog.reset()
+    failed = [r["stage"] for r in results if r["status"] == "failed"]
+    return f"failed stages: {', '.join(failed)}" if failed else "all stages up to date"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    run_initial_import()
+    # Startup: serve right away, the import and page pre-rendering run on the
+    # background job runner (one at a time, in this order)
+    started = time.perf_counter()
+    init_db()
+    print(f"Database schema ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+    timings = warmup.prepare()
+    print(f"Warm-up: mappers configured in {timings['mappers_ms']} ms, "
+          f"templates compiled in {timings['templates_ms']} ms")
+    jobs.runner.start()
+    visits.start()
+    if IMPORT_ON_STARTUP:
+        jobs.runner.submit("import", run_initial_import)
+    if warmup.WARMUP_SURAHS:
+        jobs.runner.submit("warmup", warmup.prerender_surahs)
     yield
-    # Shutdown (nothing to cleanup)
+    # Shutdown
+    jobs.runner.shutdown()
+    visits.shutdown()
 
 app = FastAPI(title="Qur'an Personal Understanding System (QPUS)", lifespan=lifespan)
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Mount static files (prefers the .br/.gz variants written by compress_static.py)
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
+
+# br/gzip for dynamic responses above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
 
 # Include Routers
 app.include_router(web_routes.router)
 app.include_router(concepts.router)
 app.include_router(reading_flows.router)
+app.include_router(chronological.router)
+app.include_router(divisions.router)
+app.include_router(accounts.router)
+app.include_router(api.router)
+
+# Per-route timing, SQL and template metrics on /metrics (QPUS_PROFILING=1, PROFILING_TOKEN)
+if os.getenv("QPUS_PROFILING", "0") == "1":
+    import profiling
+    profiling.install(
+        app,
+        engines=[engine, read_engine],
+        template_envs=[template_env],
+    )
 
 @app.get("/api/status")
-def read_root():
-    return {"message": "QPUS API is running"}
+def read_root(db: Session = Depends(get_db)):
+    return {
+        "message": "QPUS API is running",
+        # Pages are served while warming up, but may lack data the import hasn't reached
+        "status": "warming_up" if jobs.jobs_active(db) else "ready",
+        "jobs": jobs.recent_jobs(db, limit=5),
+    }
 
 @app.get("/db-check")
 def read_db_check(db: Session = Depends(get_db)):
-    count = db.query(models.Ayat).count()
-    return {"status": "Database connection successful", "ayat_count": count}
+    # A round trip is what we want to know about; COUNT(*) only measured table size
+    started = time.perf_counter()
+    db.execute(text("SELECT 1"))
+    latency_ms = (time.perf_counter() - started) * 1000
+    return {"status": "Database connection successful", "latency_ms": round(latency_ms, 2)}
 
@@ -0,0 +1,340 @@
+"""
+Schema migrations for databases created before a model change.
+
+create_all only creates missing tables, so columns and indexes added to
+existing tables are applied here. Each migration runs once and is recorded
+in schema_migration. Migrations must also be harmless on a fresh database,
+where create_all has already built the final schema.
+"""
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import IntegrityError
+
+from database import engine
+from models import (
+    SchemaMigration, UserPreference, ayat_reference_association,
+    REFERENCE_SIMILAR, REFERENCE_THEME, REFERENCE_TAFSIR,
+)
+from utils import SURAH_AYAT_COUNTS, SURAH_OFFSETS
+
+# Columns holding an ayat.id, repointed when duplicate verses are merged
+AYAT_ID_COLUMNS = [
+    ("favorite", "ayat_id"),
+    ("reflection", "ayat_id"),
+    ("reading_flow_step", "ayat_id"),
+    ("ayat_concept", "ayat_id"),
+    ("ayat_reference", "source_ayat_id"),
+    ("ayat_reference", "target_ayat_id"),
+]
+
+def _columns(conn, table):
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+def merge_duplicate_ayats(conn):
+    """Keep the lowest id of each surah:ayat and move everything pointing at the others to it"""
+    groups = conn.execute(text(
+        "SELECT surah_number, ayat_number, MIN(id) FROM ayat "
+        "GROUP BY surah_number, ayat_number HAVING COUNT(*) > 1"
+    )).all()
+    if not groups:
+        return 0
+
+    keep = {(s, a): keep_id for s, a, keep_id in groups}
+    moves = [
+        {"dup": row_id, "keep": keep[(s, a)]}
+        for row_id, s, a in conn.execute(text("SELECT id, surah_number, ayat_number FROM ayat"))
+        if (s, a) in keep and row_id != keep[(s, a)]
+    ]
+    tables = set(inspect(conn).get_table_names())
+    for table, column in AYAT_ID_COLUMNS:
+        if table not in tables:
+            continue
+        if table == "ayat_concept":
+            # Composite primary key: drop links the kept verse already has
+            conn.execute(text(
+                "DELETE FROM ayat_concept WHERE ayat_id = :dup AND concept_id IN "
+                "(SELECT concept_id FROM ayat_concept WHERE ayat_id = :keep)"
+            ), moves)
+        conn.execute(text(f"UPDATE {table} SET {column} = :keep WHERE {column} = :dup"), moves)
+    conn.execute(text("DELETE FROM ayat WHERE id = :dup"), moves)
+    return len(moves)
+
+def ayat_composite_key(conn):
+    """Unique (surah_number, ayat_number) index and a backfilled absolute_number"""
+    if "absolute_number" not in _columns(conn, "ayat"):
+        conn.execute(text("ALTER TABLE ayat ADD COLUMN absolute_number INTEGER"))
+
+    merged = merge_duplicate_ayats(conn)
+    if merged:
+        print(f"Merged {merged} duplicate ayat rows")
+
+    conn.execute(text(
+        "UPDATE ayat SET absolute_number = :offset + ayat_number "
+        "WHERE surah_number = :surah AND ayat_number BETWEEN 1 AND :count"
+    ), [
+        {"surah": surah, "offset": SURAH_OFFSETS[surah - 1], "count": count}
+        for surah, count in enumerate(SURAH_AYAT_COUNTS, 1)
+    ])
+
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_ayat_surah_ayat ON ayat (surah_number, ayat_number)"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_ayat_absolute_number ON ayat (absolute_number)"))
+    # Covered by the leading column of ix_ayat_surah_ayat
+    conn.execute(text("DROP INDEX IF EXISTS ix_ayat_surah_number"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_ayat_ayat_number"))
+
+# Tables replaced by ayat_reference:
+# (table, reference_type, degree column, mufassir column, note column, pipeline stage)
+LEGACY_REFERENCE_TABLES = [
+    ("similar_ayat", REFERENCE_SIMILAR, None, None, None, "mutashabihat"),
+    ("semantic_similarity", REFERENCE_THEME, "similarity_degree", None, None, "qursim"),
+    ("tafsir_reference", REFERENCE_TAFSIR, None, "mufassir", "note_tr", "tafsir"),
+]
+
+def ayat_reference_edges(conn):
+    """Move the surah:ayat keyed relation tables into the ayat_reference edge table"""
+    tables = set(inspect(conn).get_table_names())
+    if "ayat_reference" in tables and "degree" not in _columns(conn, "ayat_reference"):
+        # The original (unused) edge table: rebuild it with the new columns
+        legacy = conn.execute(text(
+            "SELECT source_ayat_id, target_ayat_id, reference_type FROM ayat_reference"
+        )).all()
+        conn.execute(text("DROP TABLE ayat_reference"))
+        ayat_reference_association.create(conn)
+        if legacy:
+            conn.execute(ayat_reference_association.insert(), [
+                {"source_ayat_id": s, "target_ayat_id": t, "reference_type": ref_type or REFERENCE_SIMILAR}
+                for s, t, ref_type in legacy
+            ])
+    elif "ayat_reference" not in tables:
+        ayat_reference_association.create(conn)
+
+    for table, ref_type, degree, mufassir, note, stage in LEGACY_REFERENCE_TABLES:
+        if table not in tables:
+            continue
+        total = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        moved = conn.execute(text(
+            "INSERT INTO ayat_reference (source_ayat_id, target_ayat_id, reference_type, degree, mufassir, note) "
+            f"SELECT s.id, t.id, :ref_type, {degree or 'NULL'}, {mufassir or 'NULL'}, {note or 'NULL'} "
+            f"FROM {table} r "
+            "JOIN ayat s ON s.surah_number = r.source_surah AND s.ayat_number = r.source_ayat "
+            "JOIN ayat t ON t.surah_number = r.target_surah AND t.ayat_number = r.target_ayat "
+            "ORDER BY r.id"
+        ), {"ref_type": ref_type}).rowcount
+        if moved < total:
+            # Some verses aren't imported yet; let the pipeline apply this source again
+            conn.execute(text("DELETE FROM import_stage WHERE name = :name"), {"name": stage})
+        conn.execute(text(f"DROP TABLE {table}"))
+        print(f"  {table}: moved {moved} of {total} rows to ayat_reference")
+
+def journal_keyset_indexes(conn):
+    """(created_at, id) indexes for paging favorites and reflections"""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_favorite_created ON favorite (created_at, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_reflection_created ON reflection (created_at, id)"))
+
+def reflection_search_index(conn):
+    """Full-text index over reflection text and tags (see search.py)"""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_reflection_tag ON reflection (concept_tag, created_at, id)"))
+    if conn.dialect.name == "sqlite":
+        # External-content FTS5 table kept in step with reflection by triggers
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS reflection_fts USING fts5("
+            "text_content, concept_tag, content='reflection', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS reflection_fts_insert AFTER INSERT ON reflection BEGIN "
+            "INSERT INTO reflection_fts (rowid, text_content, concept_tag) "
+            "VALUES (new.id, new.text_content, new.concept_tag); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS reflection_fts_delete AFTER DELETE ON reflection BEGIN "
+            "INSERT INTO reflection_fts (reflection_fts, rowid, text_content, concept_tag) "
+            "VALUES ('delete', old.id, old.text_content, old.concept_tag); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS reflection_fts_update AFTER UPDATE ON reflection BEGIN "
+            "INSERT INTO reflection_fts (reflection_fts, rowid, text_content, concept_tag) "
+            "VALUES ('delete', old.id, old.text_content, old.concept_tag); "
+            "INSERT INTO reflection_fts (rowid, text_content, concept_tag) "
+            "VALUES (new.id, new.text_content, new.concept_tag); END"
+        ))
+        conn.execute(text("INSERT INTO reflection_fts (reflection_fts) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        # An expression index is maintained by Postgres itself; search.py uses the same expression
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_reflection_search ON reflection USING GIN "
+            "(to_tsvector('simple', text_content || ' ' || coalesce(concept_tag, '')))"
+        ))
+
+def favorite_unique_ayat(conn):
+    """Drop duplicate favorites left by double-clicks and make ayat_id unique"""
+    removed = conn.execute(text(
+        "DELETE FROM favorite WHERE id NOT IN (SELECT MIN(id) FROM favorite GROUP BY ayat_id)"
+    )).rowcount
+    if removed:
+        print(f"  favorite: removed {removed} duplicate rows")
+        conn.execute(text("DELETE FROM counter WHERE name = 'favorites'"))  # reseeded on next read
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_favorite_ayat ON favorite (ayat_id)"))
+
+def ayat_mushaf_divisions(conn):
+    """Mushaf page and hizb quarter of every verse (see mushaf.py)"""
+    columns = _columns(conn, "ayat")
+    added = False
+    for column in ("page_number", "hizb_quarter"):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE ayat ADD COLUMN {column} INTEGER"))
+            added = True
+    if added:
+        # Fetch the corpus again on the next import to fill them in
+        conn.execute(text("DELETE FROM import_stage WHERE name = 'quran'"))
+
+def ayat_context_digest(conn):
+    """Per-verse input digest, so classify_context.py only re-scores changed verses"""
+    if "context_digest" not in _columns(conn, "ayat"):
+        conn.execute(text("ALTER TABLE ayat ADD COLUMN context_digest VARCHAR"))
+
+def ayat_concept_provenance(conn):
+    """Source and confidence of every concept link (see tag_concepts.py)"""
+    columns = _columns(conn, "ayat_concept")
+    if "source" not in columns:
+        conn.execute(text("ALTER TABLE ayat_concept ADD COLUMN source VARCHAR NOT NULL DEFAULT 'seed'"))
+    if "confidence" not in columns:
+        conn.execute(text("ALTER TABLE ayat_concept ADD COLUMN confidence FLOAT NOT NULL DEFAULT 1.0"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_ayat_concept_concept ON ayat_concept (concept_id, confidence)"
+    ))
+
+def reading_flow_generator_key(conn):
+    """Key of flows generated by flow_generator.py, so each is generated once"""
+    if "generator_key" not in _columns(conn, "reading_flow"):
+        conn.execute(text("ALTER TABLE reading_flow ADD COLUMN generator_key VARCHAR"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_reading_flow_generator_key ON reading_flow (generator_key)"
+    ))
+
+def app_user_sequence(conn):
+    """On Postgres, move the app_user id sequence past the explicitly inserted default user"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('app_user', 'id'), (SELECT MAX(id) FROM app_user))"
+        ))
+
+def per_user_state(conn):
+    """
+    Favorites, reflections and preferences owned by a user (see users.py);
+    existing rows go to the default user 1
+    """
+    conn.execute(text(
+        "INSERT INTO app_user (id, name) SELECT 1, 'misafir' "
+        "WHERE NOT EXISTS (SELECT 1 FROM app_user WHERE id = 1)"
+    ))
+    app_user_sequence(conn)
+    for table in ("favorite", "reflection", "user_preference"):
+        if "user_id" not in _columns(conn, table):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN user_id INTEGER NOT NULL DEFAULT 1"))
+
+    # Preference keys were unique across the database, now per user
+    for constraint in inspect(conn).get_unique_constraints("user_preference"):
+        if constraint["column_names"] != ["key"]:
+            continue
+        if conn.dialect.name == "sqlite":
+            # An inline UNIQUE can't be dropped: rebuild the table
+            conn.execute(text("ALTER TABLE user_preference RENAME TO user_preference_old"))
+            conn.execute(text("DROP INDEX IF EXISTS ix_user_preference_id"))
+            UserPreference.__table__.create(conn)
+            conn.execute(text(
+                "INSERT INTO user_preference (id, user_id, key, value, updated_at) "
+                "SELECT id, user_id, key, value, updated_at FROM user_preference_old"
+            ))
+            conn.execute(text("DROP TABLE user_preference_old"))
+        else:
+            conn.execute(text(f'ALTER TABLE user_preference DROP CONSTRAINT "{constraint["name"]}"'))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_user_preference_user_key ON user_preference (user_id, key)"
+    ))
+
+    # Journal and favorite indexes led by user_id
+    for old in ("ix_favorite_created", "ix_favorite_ayat", "ix_reflection_created", "ix_reflection_tag"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {old}"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_favorite_user_created ON favorite (user_id, created_at, id)"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_favorite_user_ayat ON favorite (user_id, ayat_id)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_reflection_user_created ON reflection (user_id, created_at, id)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_reflection_user_tag ON reflection (user_id, concept_tag, created_at, id)"
+    ))
+    # Counters are per user now; reseeded on next read
+    conn.execute(text("DELETE FROM counter WHERE name IN ('favorites', 'reflections')"))
+
+def ayat_translations(conn):
+    """Copy the built-in translations into ayat_translation (see import_translations.py)"""
+    from import_translations import BUILTIN_TRANSLATIONS
+    for position, builtin in enumerate(BUILTIN_TRANSLATIONS):
+        conn.execute(text(
+            "INSERT INTO translation (key, name, language, position) SELECT :key, :name, :language, :position "
+            "WHERE NOT EXISTS (SELECT 1 FROM translation WHERE key = :key)"
+        ), dict(builtin, position=position))
+        conn.execute(text(
+            "INSERT INTO ayat_translation (ayat_id, translation_id, text) "
+            f"SELECT a.id, t.id, a.{builtin['column']} FROM ayat a JOIN translation t ON t.key = :key "
+            f"WHERE a.{builtin['column']} IS NOT NULL AND a.{builtin['column']} != '' AND NOT EXISTS ("
+            "SELECT 1 FROM ayat_translation x WHERE x.ayat_id = a.id AND x.translation_id = t.id)"
+        ), {"key": builtin["key"]})
+
+def generated_flows_unstored(conn):
+    """Flows made by flow_generator.py are rendered, no longer stored: drop the stored ones"""
+    if "generator_key" not in _columns(conn, "reading_flow"):
+        return
+    conn.execute(text(
+        "DELETE FROM reading_flow_step WHERE flow_id IN "
+        "(SELECT id FROM reading_flow WHERE generator_key IS NOT NULL)"
+    ))
+    conn.execute(text("DELETE FROM reading_flow WHERE generator_key IS NOT NULL"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_reading_flow_generator_key"))
+    conn.execute(text("ALTER TABLE reading_flow DROP COLUMN generator_key"))
+
+def job_heartbeat(conn):
+    """Heartbeat of queued and running jobs, so a starting replica leaves live ones alone"""
+    if "heartbeat_at" not in _columns(conn, "job"):
+        conn.execute(text("ALTER TABLE job ADD COLUMN heartbeat_at TIMESTAMP"))
+
+# In order of application; never rename or reorder an applied migration
+MIGRATIONS = [
+    ("0001_ayat_composite_key", ayat_composite_key),
+    ("0002_ayat_reference_edges", ayat_reference_edges),
+    ("0003_journal_keyset_indexes", journal_keyset_indexes),
+    ("0004_reflection_search_index", reflection_search_index),
+    ("0005_favorite_unique_ayat", favorite_unique_ayat),
+    ("0006_ayat_mushaf_divisions", ayat_mushaf_divisions),
+    ("0007_ayat_context_digest", ayat_context_digest),
+    ("0008_ayat_concept_provenance", ayat_concept_provenance),
+    ("0009_reading_flow_generator_key", reading_flow_generator_key),
+    ("0010_per_user_state", per_user_state),
+    ("0011_ayat_translations", ayat_translations),
+    ("0012_app_user_sequence", app_user_sequence),
+    ("0013_generated_flows_unstored", generated_flows_unstored),
+    ("0014_job_heartbeat", job_heartbeat),
+]
+
+def run_migrations(bind=engine) -> list:
+    """Apply pending migrations. Returns the names applied."""
+    SchemaMigration.__table__.create(bind=bind, checkfirst=True)
+    with bind.connect() as conn:
+        applied = set(conn.execute(select(SchemaMigration.name)).scalars())
+
+    newly_applied = []
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        try:
+            with bind.begin() as conn:
+                migrate(conn)
+                conn.execute(SchemaMigration.__table__.insert().values(name=name))
+        except IntegrityError:
+            with bind.connect() as conn:
+                if conn.execute(select(SchemaMigration.name).where(SchemaMigration.name == name)).first():
+                    continue  # another worker applied it first
+            raise
+        print(f"Applied migration {name}")
+        newly_applied.append(name)
+    return newly_applied
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, TIMESTAMP, Table, Boolean
-from sqlalchemy.orm import relationship, Mapped, mapped_column
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, TIMESTAMP, Table, Boolean, Index, Float
+from sqlalchemy.orm import relationship, deferred, Mapped, mapped_column
 from sqlalchemy.sql import func
 from typing import Optional, List
 from database import Base
@@ -10,30 +10,73 @@ ayat_concept_association = Table(
     Base.metadata,
     Column("ayat_id", Integer, ForeignKey("ayat.id"), primary_key=True),
     Column("concept_id", Integer, ForeignKey("concept.id"), primary_key=True),
+    # "seed" for seed_concepts.py links, else the evidence tag_concepts.py found,
+    # e.g. "lexical+root+similar"
+    Column("source", String, nullable=False, server_default="seed"),
+    Column("confidence", Float, nullable=False, server_default="1.0"),  # 0-1, seeds 1.0
+    # A concept page reads its verses strongest first
+    Index("ix_ayat_concept_concept", "concept_id", "confidence"),
 )
 
 class Ayat(Base):
     __tablename__ = "ayat"
 
     id = Column(Integer, primary_key=True, index=True)
-    surah_number = Column(Integer, index=True)
-    ayat_number = Column(Integer, index=True)
+    surah_number = Column(Integer)
+    ayat_number = Column(Integer)
+    absolute_number = Column(Integer, unique=True, index=True)  # 1-6236 in mushaf order
+    page_number = Column(Integer, nullable=True)  # Medina mushaf page, 1-604
+    hizb_quarter = Column(Integer, nullable=True)  # rub' al-hizb, 1-240
     arabic_text = Column(Text, nullable=False)
-    translation_1 = Column(Text, nullable=True)  # Elmalılı
-    translation_2 = Column(Text, nullable=True)  # Diyanet
+    # Source columns of the built-in translations, read by the classifiers and the
+    # API. Pages read translations from ayat_translation, so these are deferred.
+    translation_1 = deferred(Column(Text, nullable=True))  # Elmalılı
+    translation_2 = deferred(Column(Text, nullable=True))  # Diyanet
     
     # New fields for scope completion
     is_mekki = Column(Boolean, nullable=True)  # True=Mekki, False=Medeni, None=Unknown
     context_type = Column(String, nullable=True)  # "vaat", "uyari", "anlatim", etc.
+    context_digest = Column(String, nullable=True)  # input digest of classify_context.py
     
     # Relationships
     concepts = relationship("Concept", secondary=ayat_concept_association, back_populates="ayats")
     reflections = relationship("Reflection", back_populates="ayat")
     favorites = relationship("Favorite", back_populates="ayat")
 
+    # One index probe per surah:ayat lookup (its leading column also serves surah
+    # lookups), and a re-run import can't create duplicate verses
+    __table_args__ = (
+        Index("ix_ayat_surah_ayat", "surah_number", "ayat_number", unique=True),
+    )
+
     def __repr__(self):
         return f"<Ayat {self.surah_number}:{self.ayat_number}>"
 
+class Translation(Base):
+    """A translation of the Qur'an whose verses are stored in ayat_translation"""
+    __tablename__ = "translation"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, nullable=False)  # e.g. "elmalili", "qurancom-77"
+    name = Column(String, nullable=False)  # e.g. "Elmalılı Hamdi Yazır"
+    language = Column(String, nullable=True)  # e.g. "tr"
+    position = Column(Integer, nullable=False, default=0)  # display order
+
+    def __repr__(self):
+        return f"<Translation {self.key}>"
+
+# Verse texts of every translation; a page loads only the rows of the
+# translations its user selected (see translations.py)
+ayat_translation_association = Table(
+    "ayat_translation",
+    Base.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("ayat_id", Integer, ForeignKey("ayat.id"), nullable=False),
+    Column("translation_id", Integer, ForeignKey("translation.id"), nullable=False),
+    Column("text", Text, nullable=False),
+    Index("ix_ayat_translation_ayat", "ayat_id", "translation_id", unique=True),
+)
+
 class Concept(Base):
     __tablename__ = "concept"
 
@@ -47,10 +90,23 @@ class Concept(Base):
     def __repr__(self):
         return f"<Concept {self.name}>"
 
+class User(Base):
+    """An account; user 1 owns the state of requests without a sign-in (see users.py)"""
+    __tablename__ = "app_user"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    password_hash = Column(String, nullable=True)  # scrypt "salt$digest"; None for the default user
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<User {self.name}>"
+
 class Reflection(Base):
     __tablename__ = "reflection"
 
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("app_user.id"), nullable=False, server_default="1")
     ayat_id = Column(Integer, ForeignKey("ayat.id"), nullable=False)
     text_content = Column(Text, nullable=False)
     concept_tag = Column(String, nullable=True)  # Optional concept tag for the reflection
@@ -59,6 +115,13 @@ class Reflection(Base):
     # Relationships
     ayat = relationship("Ayat", back_populates="reflections")
 
+    # Each user's journal is paged newest first on (created_at, id), also within
+    # one tag. The full-text index is created by migration 0004 (see search.py).
+    __table_args__ = (
+        Index("ix_reflection_user_created", "user_id", "created_at", "id"),
+        Index("ix_reflection_user_tag", "user_id", "concept_tag", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<Reflection for Ayat {self.ayat_id}>"
 
@@ -67,12 +130,19 @@ class Favorite(Base):
     __tablename__ = "favorite"
 
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("app_user.id"), nullable=False, server_default="1")
     ayat_id = Column(Integer, ForeignKey("ayat.id"), nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
     # Relationships
     ayat = relationship("Ayat", back_populates="favorites")
 
+    __table_args__ = (
+        Index("ix_favorite_user_created", "user_id", "created_at", "id"),
+        # A verse is a favorite of a user at most once
+        Index("ix_favorite_user_ayat", "user_id", "ayat_id", unique=True),
+    )
+
     def __repr__(self):
         return f"<Favorite Ayat {self.ayat_id}>"
 
@@ -81,13 +151,39 @@ class UserPreference(Base):
     __tablename__ = "user_preference"
 
     id = Column(Integer, primary_key=True, index=True)
-    key = Column(String, unique=True, nullable=False)  # e.g. "last_read_surah", "last_read_ayat"
+    user_id = Column(Integer, ForeignKey("app_user.id"), nullable=False, server_default="1")
+    key = Column(String, nullable=False)  # e.g. "last_read_surah", "last_read_ayat"
     value = Column(String, nullable=True)
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        Index("ix_user_preference_user_key", "user_id", "key", unique=True),
+    )
+
     def __repr__(self):
         return f"<UserPreference {self.key}={self.value}>"
 
+class Counter(Base):
+    """Row counts kept up to date on write, so pages don't COUNT(*) large tables"""
+    __tablename__ = "counter"
+
+    name = Column(String, primary_key=True)  # e.g. "favorites:1", "reflections:1" (per user)
+    value = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<Counter {self.name}={self.value}>"
+
+class SurahVisit(Base):
+    """Page views per surah; the most visited are pre-rendered at startup"""
+    __tablename__ = "surah_visit"
+
+    surah_number = Column(Integer, primary_key=True)
+    visits = Column(Integer, nullable=False, default=0)
+    last_visited_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<SurahVisit {self.surah_number}={self.visits}>"
+
 class ReadingFlow(Base):
     """Predefined guided reading flows"""
     __tablename__ = "reading_flow"
@@ -132,12 +228,67 @@ class NuzulSebebi(Base):
     def __repr__(self):
         return f"<NuzulSebebi {self.surah_number}:{self.ayat_number}>"
 
-# Association table for Many-to-Many ayat cross-references
+# Typed cross-reference edges between verses, keyed by ayat.id: word similarity
+# (Mutashabihat), meaning similarity (QurSim) and classical tafsir references
+REFERENCE_SIMILAR = "similar"
+REFERENCE_THEME = "theme"
+REFERENCE_TAFSIR = "tefsir"
+
 ayat_reference_association = Table(
     "ayat_reference",
     Base.metadata,
-    Column("source_ayat_id", Integer, ForeignKey("ayat.id"), primary_key=True),
-    Column("target_ayat_id", Integer, ForeignKey("ayat.id"), primary_key=True),
-    Column("reference_type", String, nullable=True),  # "tefsir", "theme", "similar"
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("source_ayat_id", Integer, ForeignKey("ayat.id"), nullable=False),
+    Column("target_ayat_id", Integer, ForeignKey("ayat.id"), nullable=False),
+    Column("reference_type", String, nullable=False),  # "similar", "theme", "tefsir"
+    Column("degree", Integer, nullable=True),  # theme strength: 2=strong, 1=weak
+    Column("mufassir", String, nullable=True),  # tefsir: scholar name
+    Column("note", Text, nullable=True),  # tefsir: Turkish note
+    # Outgoing and incoming panels are each one index range scan
+    Index("ix_ayat_reference_source", "source_ayat_id", "reference_type"),
+    Index("ix_ayat_reference_target", "target_ayat_id", "reference_type"),
 )
 
+
+class ImportStage(Base):
+    """Digest of the source data last applied by each import pipeline stage"""
+    __tablename__ = "import_stage"
+
+    name = Column(String, primary_key=True)  # e.g. "quran", "tafsir"
+    digest = Column(String, nullable=False)  # sha256 of the stage's source rows
+    row_count = Column(Integer, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ImportStage {self.name}>"
+
+
+class SchemaMigration(Base):
+    """Migrations from migrations.py that have been applied to this database"""
+    __tablename__ = "schema_migration"
+
+    name = Column(String, primary_key=True)  # e.g. "0001_ayat_composite_key"
+    applied_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<SchemaMigration {self.name}>"
+
+
+class Job(Base):
+    """A background job run by jobs.runner (imports, precomputation)"""
+    __tablename__ = "job"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)  # e.g. "import"
+    status = Column(String, nullable=False, default="queued")  # queued, running, done, failed, interrupted
+    progress = Column(Integer, nullable=False, default=0)  # percent
+    detail = Column(Text, nullable=True)  # last progress message, result or error
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    # Touched every jobs.JOB_HEARTBEAT seconds by the process running the job
+    heartbeat_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Job {self.name} {self.status}>"
@@ -0,0 +1,61 @@
+"""
+Mushaf divisions as ranges of absolute verse numbers.
+
+Every juz, hizb quarter and page is a contiguous run of verses, so each is
+stored as the sorted list of its first verses: a division's range is two list
+reads, and the division holding a verse is one bisect. Juz starts are fixed
+(utils.JUZ_STARTS); page and hizb quarter starts come from the imported
+corpus, read with one query on first use and again after an import.
+"""
+import threading
+from bisect import bisect_right
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Ayat
+from utils import JUZ_START_NUMBERS, TOTAL_AYATS
+
+# Division -> number of parts
+DIVISIONS = {"juz": 30, "hizb": 240, "page": 604}
+
+class MushafBoundaries:
+    def __init__(self):
+        self._starts = None
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session) -> dict:
+        starts = self._starts
+        if starts is not None:
+            return starts
+        with self._lock:
+            if self._starts is None:
+                starts = {"juz": JUZ_START_NUMBERS}
+                for division, column in (("page", Ayat.page_number), ("hizb", Ayat.hizb_quarter)):
+                    rows = db.query(column, func.min(Ayat.absolute_number)).filter(column.isnot(None)).group_by(column).all()
+                    # Complete only once the corpus import has filled in every part
+                    starts[division] = [first for _, first in sorted(rows)] if len(rows) == DIVISIONS[division] else None
+                self._starts = starts
+            return self._starts
+
+    def verse_range(self, db: Session, division: str, n: int):
+        """(first, last) absolute numbers of part n, or None if unknown"""
+        starts = self._load(db).get(division)
+        if not starts or not 1 <= n <= len(starts):
+            return None
+        last = starts[n] - 1 if n < len(starts) else TOTAL_AYATS
+        return starts[n - 1], last
+
+    def part_of(self, db: Session, division: str, number):
+        """The part of a division holding an absolute verse number, or None"""
+        starts = self._load(db).get(division)
+        if not starts or not number:
+            return None
+        return bisect_right(starts, number)
+
+    def reset(self):
+        """Reload page and hizb boundaries on next use (after an import)"""
+        with self._lock:
+            self._starts = None
+
+boundaries = MushafBoundaries()
@@ -0,0 +1,47 @@
+"""
+Keyset pagination for the newest-first journal pages (favorites, reflections).
+
+A page is read with `(created_at, id) < (cursor)` through the table's
+(created_at, id) index, so every page costs the same however long the journal
+grows, and rows added while a reader scrolls don't shift later pages. The
+cursor is an opaque, URL-safe token holding the last row's created_at and id.
+"""
+import base64
+import json
+import os
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import String, bindparam, tuple_
+
+from database import IS_SQLITE
+
+JOURNAL_PAGE_SIZE = int(os.getenv("JOURNAL_PAGE_SIZE", "50"))
+
+def encode_cursor(row) -> str:
+    payload = json.dumps([row.created_at.isoformat(" ") if row.created_at else None, row.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Return (created_at, id), or raise a 400 for a malformed cursor"""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+
+def _timestamp_param(value: datetime):
+    if IS_SQLITE:
+        # SQLite keeps CURRENT_TIMESTAMP as text without microseconds; compare
+        # against the same text, not SQLAlchemy's ".000000" bind format
+        return bindparam(None, value.isoformat(" "), type_=String)
+    return value
+
+def keyset_page(query, model, cursor=None, limit=JOURNAL_PAGE_SIZE):
+    """Newest-first page of `query` after `cursor`. Returns (rows, next_cursor)."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(_timestamp_param(created_at), row_id))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,71 @@
+"""
+User preferences (last read position) cached per user.
+
+A user's preferences are read with one query on first use and kept in a
+users.PerUserCache, so the home page and every surah view read them from
+memory. A write compares with the stored rows (one query for all the keys
+written), not with this process' copy, which another worker may have
+outdated, and only upserts the values that differ.
+"""
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import IS_SQLITE
+from models import UserPreference
+from users import PerUserCache
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert
+else:
+    from sqlalchemy.dialects.postgresql import insert
+
+class UserPreferences:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._values = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self, db: Session) -> dict:
+        if self._values is None:
+            with self._lock:
+                if self._values is None:
+                    self._values = dict(
+                        db.query(UserPreference.key, UserPreference.value)
+                        .filter(UserPreference.user_id == self.user_id)
+                    )
+        return self._values
+
+    def get(self, db: Session, key: str):
+        return self._ensure_loaded(db).get(key)
+
+    def set(self, db: Session, changes: dict):
+        """Store the {key: value} that changed; committed together with the caller's next commit"""
+        values = self._ensure_loaded(db)
+        stored = dict(
+            db.query(UserPreference.key, UserPreference.value)
+            .filter(UserPreference.user_id == self.user_id, UserPreference.key.in_(changes))
+        )
+        for key, value in changes.items():
+            if stored.get(key) != value:
+                statement = insert(UserPreference).values(user_id=self.user_id, key=key, value=value)
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=["user_id", "key"],
+                    set_={"value": statement.excluded.value, "updated_at": func.now()},
+                ))
+            values[key] = value
+
+preferences = PerUserCache(UserPreferences)
+
+def get_preference(db: Session, user_id, key: str):
+    """A user's value for key; None for guests (user_id None)"""
+    return preferences.get(user_id).get(db, key) if user_id is not None else None
+
+def set_preference(db: Session, user_id, key: str, value: str):
+    set_preferences(db, user_id, {key: value})
+
+def set_preferences(db: Session, user_id, changes: dict):
+    """Store a user's {key: value}; guests keep no preferences"""
+    if user_id is not None:
+        preferences.get(user_id).set(db, changes)
@@ -0,0 +1,246 @@
+"""
+Opt-in request profiling (enable with QPUS_PROFILING=1).
+
+Per route it records wall time, SQL query count and time (from SQLAlchemy
+cursor events), template render time and response size, and exposes them in
+Prometheus text format on /metrics. /debug/profile drives a small sampling
+profiler that reports collapsed stacks (flamegraph.pl / speedscope format).
+
+Both endpoints require PROFILING_TOKEN, sent as "Authorization: Bearer <token>"
+(Prometheus' bearer_token); without it set they answer 403. Query strings end
+up in access logs, so the token is not accepted there.
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse, JSONResponse
+from jinja2 import Template
+from sqlalchemy import event
+
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+# The sampler busy-loops below this
+MIN_INTERVAL_MS = 1
+
+# Upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Accumulator of the request being served; a mutable dict so that work done in
+# threadpool copies of the context is still added to the same request
+_current = ContextVar("qpus_request_stats", default=None)
+
+router = APIRouter()
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = defaultdict(lambda: {
+            "count": 0,
+            "seconds": 0.0,
+            "buckets": [0] * len(DURATION_BUCKETS),
+            "sql_queries": 0,
+            "sql_seconds": 0.0,
+            "template_seconds": 0.0,
+            "response_bytes": 0,
+        })
+
+    def observe(self, method, route, seconds, stats):
+        with self.lock:
+            m = self.routes[(method, route)]
+            m["count"] += 1
+            m["seconds"] += seconds
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    m["buckets"][i] += 1
+            m["sql_queries"] += stats["sql_queries"]
+            m["sql_seconds"] += stats["sql_seconds"]
+            m["template_seconds"] += stats["template_seconds"]
+            m["response_bytes"] += stats["response_bytes"]
+
+    def render_prometheus(self) -> str:
+        with self.lock:
+            snapshot = {key: dict(m, buckets=list(m["buckets"])) for key, m in self.routes.items()}
+
+        lines = [
+            "# HELP qpus_request_duration_seconds Wall time per request.",
+            "# TYPE qpus_request_duration_seconds histogram",
+        ]
+        for (method, route), m in sorted(snapshot.items()):
+            labels = f'method="{method}",route="{route}"'
+            for bound, count in zip(DURATION_BUCKETS, m["buckets"]):
+                lines.append(f'qpus_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'qpus_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m["count"]}')
+            lines.append(f"qpus_request_duration_seconds_sum{{{labels}}} {m['seconds']:.6f}")
+            lines.append(f"qpus_request_duration_seconds_count{{{labels}}} {m['count']}")
+
+        counters = [
+            ("qpus_sql_queries_total", "sql_queries", "SQL statements executed."),
+            ("qpus_sql_duration_seconds_total", "sql_seconds", "Time spent in SQL statements."),
+            ("qpus_template_render_seconds_total", "template_seconds", "Time spent rendering templates."),
+            ("qpus_response_bytes_total", "response_bytes", "Response body bytes sent."),
+        ]
+        for name, field, help_text in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (method, route), m in sorted(snapshot.items()):
+                value = m[field]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f'{name}{{method="{method}",route="{route}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = RouteMetrics()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware, so streamed bodies are measured without buffering"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = {"sql_queries": 0, "sql_seconds": 0.0, "template_seconds": 0.0, "response_bytes": 0}
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.body":
+                stats["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded; mounts share one label
+            label = getattr(route, "path", None) or "unmatched"
+            metrics.observe(scope["method"], label, time.perf_counter() - started, stats)
+
+
+# The start time lives on the statement's execution context, which is dropped
+# with it when the statement raises (no after_cursor_execute then)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._qpus_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_qpus_query_start", None)
+    stats = _current.get()
+    if stats is not None and started is not None:
+        stats["sql_queries"] += 1
+        stats["sql_seconds"] += time.perf_counter() - started
+
+
+class TimedTemplate(Template):
+    """Template that adds its render time to the current request"""
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats["template_seconds"] += time.perf_counter() - started
+
+
+class SamplingProfiler:
+    """Samples the stacks of all other threads at a fixed interval"""
+
+    def __init__(self):
+        self.samples = Counter()
+        self.lock = threading.Lock()
+        self.interval = 0.005
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval):
+        if self.running:
+            return
+        with self.lock:
+            self.samples.clear()
+        self.interval = interval
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="qpus-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                with self.lock:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self, limit=200) -> str:
+        with self.lock:
+            top = self.samples.most_common(limit)
+        return "\n".join(f"{stack} {count}" for stack, count in top) + "\n"
+
+
+profiler = SamplingProfiler()
+
+
+def require_token(request: Request):
+    """Dependency: the request carries PROFILING_TOKEN as a bearer token"""
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=403, detail="Set PROFILING_TOKEN to use the profiling endpoints")
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    supplied = credentials if scheme.lower() == "bearer" else ""
+    if not hmac.compare_digest(supplied.encode(), PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_token)])
+def read_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/debug/profile", dependencies=[Depends(require_token)])
+def debug_profile(action: str = "report", interval_ms: float = 5, limit: int = 200):
+    """action=start begins sampling, action=stop ends it; both report collapsed stacks"""
+    if action == "start":
+        interval_ms = max(interval_ms, MIN_INTERVAL_MS)
+        profiler.start(interval_ms / 1000)
+        return JSONResponse({"profiling": True, "interval_ms": interval_ms})
+    if action == "stop":
+        profiler.stop()
+    return PlainTextResponse(profiler.collapsed(limit))
+
+
+def install(app, engines, template_envs):
+    """Attach the middleware, SQL listeners and template timing to the app"""
+    app.add_middleware(ProfilingMiddleware)
+    for engine in set(engines):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    for env in template_envs:
+        env.template_class = TimedTemplate
+        env.cache.clear()
+    app.include_router(router)
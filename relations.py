@@ -0,0 +1,46 @@
+"""
+Cross-reference queries over the ayat_reference edge table.
+
+Each direction is a single join through the (source_ayat_id, reference_type)
+or (target_ayat_id, reference_type) index. Rows come back as
+(ayat_number, other_surah, other_ayat, reference_type, degree, mufassir, note),
+where ayat_number is the verse on this side of the edge, ordered by type and
+then by import order.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+from models import Ayat, ayat_reference_association as reference
+
+def _edges(db: Session, direction, filters, types=None):
+    here, other = aliased(Ayat), aliased(Ayat)
+    if direction == "outgoing":
+        here_id, other_id = reference.c.source_ayat_id, reference.c.target_ayat_id
+    else:
+        here_id, other_id = reference.c.target_ayat_id, reference.c.source_ayat_id
+
+    query = (
+        select(
+            here.ayat_number, other.surah_number, other.ayat_number,
+            reference.c.reference_type, reference.c.degree, reference.c.mufassir, reference.c.note,
+        )
+        .join_from(here, reference, here_id == here.id)
+        .join(other, other_id == other.id)
+        .where(*filters(here))
+        .order_by(reference.c.reference_type, reference.c.id)
+    )
+    if types:
+        query = query.where(reference.c.reference_type.in_(types))
+    return db.execute(query).all()
+
+def surah_references(db: Session, surah_number, direction="outgoing", types=None):
+    """Edges leaving (or, with direction="incoming", reaching) any verse of a surah"""
+    return _edges(db, direction, lambda here: [here.surah_number == surah_number], types)
+
+def verse_references(db: Session, surah_number, ayat_number, direction="outgoing", types=None):
+    """Edges leaving (or reaching) one verse"""
+    return _edges(
+        db, direction,
+        lambda here: [here.surah_number == surah_number, here.ayat_number == ayat_number],
+        types,
+    )
@@ -0,0 +1,102 @@
+"""
+Sign-up, sign-in and sign-out.
+
+Signing in sets the signed users.USER_COOKIE; favorites, reflections, the
+last read position and the chosen translations then belong to that user.
+Without the cookie a request is the default user until it is claimed (see
+users.py), a guest after.
+"""
+from typing import List
+
+from fastapi import APIRouter, Request, Depends, Form
+from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import get_db
+from models import User
+from templating import templates
+from translations import catalog, selected_translations, select_translations
+from users import (
+    USER_COOKIE, USER_COOKIE_MAX_AGE, MIN_PASSWORD_LENGTH,
+    current_user_id, require_user, sign_user, hash_password, check_password,
+)
+
+router = APIRouter()
+
+def account_page(request: Request, db: Session, user_id, error: str = None, status_code: int = 200):
+    user = db.get(User, user_id) if user_id is not None else None
+    return templates.TemplateResponse("account.html", {
+        "request": request,
+        # The unclaimed default user has no password and can't be signed in to
+        "user": user if user is not None and user.password_hash else None,
+        "guest": user_id is None,
+        "translations": catalog.all(db),
+        "selected": {t.key for t in selected_translations(db, user_id)},
+        "error": error
+    }, status_code=status_code)
+
+def signed_in(user_id: int) -> RedirectResponse:
+    response = RedirectResponse(url="/", status_code=303)
+    response.set_cookie(
+        USER_COOKIE, sign_user(user_id), max_age=USER_COOKIE_MAX_AGE, httponly=True, samesite="lax"
+    )
+    return response
+
+@router.get("/account", response_class=HTMLResponse)
+async def read_account(request: Request, db: Session = Depends(get_db), user_id: int = Depends(current_user_id)):
+    return account_page(request, db, user_id)
+
+@router.post("/account/register", response_class=HTMLResponse)
+def register(
+    request: Request,
+    name: str = Form(...),
+    password: str = Form(...),
+    db: Session = Depends(get_db)
+):
+    name = name.strip()
+    if not name or len(password) < MIN_PASSWORD_LENGTH:
+        return account_page(
+            request, db, DEFAULT_USER_ID, f"Kullanıcı adı boş, parola en az {MIN_PASSWORD_LENGTH} karakter olmalı", 400
+        )
+    password_hash = hash_password(password)
+    for _ in range(2):
+        user = User(name=name, password_hash=password_hash)
+        db.add(user)
+        try:
+            db.commit()
+            return signed_in(user.id)
+        except IntegrityError:
+            db.rollback()
+            if db.query(User.id).filter(User.name == name).first():
+                return account_page(request, db, current_user_id(request), "Bu kullanıcı adı alınmış", 400)
+            # An id conflict (a lagging id sequence); the failed insert moved it on
+    return account_page(request, db, current_user_id(request), "Hesap oluşturulamadı, lütfen tekrar deneyin", 503)
+
+@router.post("/account/login", response_class=HTMLResponse)
+def login(
+    request: Request,
+    name: str = Form(...),
+    password: str = Form(...),
+    db: Session = Depends(get_db)
+):
+    user = db.query(User).filter(User.name == name.strip()).first()
+    if user is None or not check_password(password, user.password_hash):
+        return account_page(request, db, current_user_id(request), "Kullanıcı adı veya parola hatalı", 400)
+    return signed_in(user.id)
+
+@router.post("/account/translations")
+def choose_translations(
+    keys: List[str] = Form([]),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(require_user)
+):
+    """Store the translations shown on verse pages; none selected falls back to the defaults"""
+    select_translations(db, user_id, keys)
+    db.commit()
+    return RedirectResponse(url="/account", status_code=303)
+
+@router.post("/account/logout")
+def logout():
+    response = RedirectResponse(url="/", status_code=303)
+    response.delete_cookie(USER_COOKIE)
+    return response
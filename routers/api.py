@@ -0,0 +1,231 @@
+"""
+Versioned JSON API (/api/v1) for clients that need verses without the HTML.
+
+Verse payloads can be trimmed with ?fields= (surah and ayat are always
+included), and ?translations=diyanet,qurancom-77 adds a "translations" object
+with those stored translations (ayat_translation) by key. Corpus data only changes when the import pipeline runs, so
+responses carry an ETag and a public Cache-Control.
+"""
+import hashlib
+import json
+import os
+from itertools import islice
+from typing import Optional
+
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import and_, or_, case
+from sqlalchemy.orm import Session
+from database import get_read_db, ReadSessionLocal
+from models import Ayat, REFERENCE_SIMILAR, REFERENCE_THEME, REFERENCE_TAFSIR
+from relations import verse_references
+from translations import catalog, keyed_texts
+from utils import SURAH_NAMES
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
+API_MAX_AGE = int(os.getenv("API_MAX_AGE", "3600"))  # seconds
+MAX_BATCH_VERSES = int(os.getenv("MAX_BATCH_VERSES", "500"))
+
+router = APIRouter(prefix="/api/v1")
+
+# Public field name -> column; surah and ayat lead every selection
+VERSE_FIELDS = {
+    "surah": Ayat.surah_number,
+    "ayat": Ayat.ayat_number,
+    "id": Ayat.id,
+    "arabic_text": Ayat.arabic_text,
+    "translation_1": Ayat.translation_1,  # Elmalılı
+    "translation_2": Ayat.translation_2,  # Diyanet
+    "is_mekki": Ayat.is_mekki,
+    "context_type": Ayat.context_type,
+}
+
+def dumps(payload) -> bytes:
+    if orjson:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def json_response(request: Request, payload, max_age=API_MAX_AGE) -> Response:
+    """Serialize payload with an ETag, answering If-None-Match with 304"""
+    body = dumps(payload)
+    etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def parse_fields(fields: Optional[str]) -> list:
+    """?fields=arabic_text,translation_1 -> selected field names (all by default)"""
+    if not fields:
+        return list(VERSE_FIELDS)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in VERSE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["surah", "ayat"] + [name for name in names if name not in ("surah", "ayat")]
+
+def parse_translations(db: Session, spec: Optional[str]) -> tuple:
+    """?translations=diyanet,elmalili -> catalog entries, in the requested order"""
+    if not spec:
+        return ()
+    entries = {e.key: e for e in catalog.all(db)}
+    keys = list(dict.fromkeys(key.strip() for key in spec.split(",") if key.strip()))
+    unknown = [key for key in keys if key not in entries]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown translations: {', '.join(unknown)}")
+    return tuple(entries[key] for key in keys)
+
+def parse_refs(spec: str) -> list:
+    """'2:255,3:1-5' -> [(2, 255, 255), (3, 1, 5)]; at most MAX_BATCH_VERSES verses in total"""
+    ranges = []
+    for ref in spec.split(","):
+        ref = ref.strip()
+        if not ref:
+            continue
+        try:
+            surah, _, ayats = ref.partition(":")
+            first, _, last = ayats.partition("-")
+            surah, first = int(surah), int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid verse reference: {ref!r}")
+        if first < 1 or last < first:
+            raise HTTPException(status_code=400, detail=f"Invalid verse range: {ref!r}")
+        ranges.append((surah, first, last))
+    if sum(last - first + 1 for _, first, last in ranges) > MAX_BATCH_VERSES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_VERSES} verses per request")
+    return ranges
+
+def expand_refs(ranges) -> list:
+    """Requested (surah, ayat) pairs in request order, without repeats"""
+    return list(dict.fromkeys((s, a) for s, first, last in ranges for a in range(first, last + 1)))
+
+def ranges_filter(ranges):
+    """One condition per range, all served by the (surah_number, ayat_number) lookup"""
+    return or_(*[
+        and_(Ayat.surah_number == s, Ayat.ayat_number.between(first, last))
+        for s, first, last in ranges
+    ])
+
+def verse_query(db: Session, names: list, translations=()):
+    # Verse ids for the translation lookup go last, where verse_dict's zip drops them
+    columns = [VERSE_FIELDS[name] for name in names]
+    return db.query(*columns, Ayat.id) if translations else db.query(*columns)
+
+def verse_dict(names: list, row) -> dict:
+    return dict(zip(names, row))
+
+def verse_dicts(db: Session, names: list, rows, translations=()) -> list:
+    """Verse payloads of verse_query rows, with their translations when any were asked for"""
+    if not translations:
+        return [verse_dict(names, row) for row in rows]
+    texts = keyed_texts(db, [row[-1] for row in rows], translations)
+    return [dict(verse_dict(names, row), translations=texts.get(row[-1], {})) for row in rows]
+
+@router.get("/surah/{surah_number}")
+def api_surah(request: Request, surah_number: int, fields: str = None, translations: str = None,
+              db: Session = Depends(get_read_db)):
+    names = parse_fields(fields)
+    selected = parse_translations(db, translations)
+    rows = verse_query(db, names, selected).filter(Ayat.surah_number == surah_number).order_by(Ayat.ayat_number).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Surah not found")
+    return json_response(request, {
+        "surah": surah_number,
+        "name": SURAH_NAMES.get(surah_number),
+        "verse_count": len(rows),
+        "verses": verse_dicts(db, names, rows, selected),
+    })
+
+@router.get("/verse/{surah_number}:{ayat_number}")
+def api_verse(request: Request, surah_number: int, ayat_number: int, fields: str = None,
+              translations: str = None, db: Session = Depends(get_read_db)):
+    names = parse_fields(fields)
+    selected = parse_translations(db, translations)
+    row = verse_query(db, names, selected).filter(
+        Ayat.surah_number == surah_number, Ayat.ayat_number == ayat_number
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Verse not found")
+    return json_response(request, verse_dicts(db, names, [row], selected)[0])
+
+@router.get("/verse/{surah_number}:{ayat_number}/relations")
+def api_verse_relations(request: Request, surah_number: int, ayat_number: int, db: Session = Depends(get_read_db)):
+    """Word similarity, meaning similarity and tafsir references, in both directions"""
+    payload = {"surah": surah_number, "ayat": ayat_number, "similar": [], "semantic": [], "tafsir": []}
+    for _, surah, ayat, ref_type, degree, mufassir, note in verse_references(db, surah_number, ayat_number):
+        if ref_type == REFERENCE_SIMILAR:
+            payload["similar"].append({"surah": surah, "ayat": ayat})
+        elif ref_type == REFERENCE_THEME:
+            payload["semantic"].append({"surah": surah, "ayat": ayat, "degree": degree})
+        elif ref_type == REFERENCE_TAFSIR:
+            payload["tafsir"].append({"surah": surah, "ayat": ayat, "mufassir": mufassir, "note": note})
+    payload["referenced_by"] = [
+        {"surah": surah, "ayat": ayat, "type": "kelime" if ref_type == REFERENCE_SIMILAR else "anlam"}
+        for _, surah, ayat, ref_type, *_ in verse_references(
+            db, surah_number, ayat_number, "incoming", types=(REFERENCE_SIMILAR, REFERENCE_THEME)
+        )
+    ]
+    return json_response(request, payload)
+
+@router.get("/verses")
+def api_verses(request: Request, ids: str = Query(..., description="e.g. 2:255,3:1-5"), fields: str = None,
+               translations: str = None, db: Session = Depends(get_read_db)):
+    """Several verses in one round trip, returned in the requested order"""
+    ranges = parse_refs(ids)
+    names = parse_fields(fields)
+    selected = parse_translations(db, translations)
+    rows = verse_query(db, names, selected).filter(ranges_filter(ranges)).all() if ranges else []
+    by_ref = {(row[0], row[1]): row for row in rows}
+    refs = expand_refs(ranges)
+    return json_response(request, {
+        "verses": verse_dicts(db, names, [by_ref[ref] for ref in refs if ref in by_ref], selected),
+        "missing": [f"{s}:{a}" for s, a in refs if (s, a) not in by_ref],
+    })
+
+@router.get("/verses/batch")
+def api_verses_batch(refs: str = Query(..., description="e.g. 2:255,3:1-5"), fields: str = None,
+                     translations: str = None, db: Session = Depends(get_read_db)):
+    """
+    Streams the verses as NDJSON (one object per line) in the requested order,
+    followed by a {"missing": [...]} line when some references don't exist.
+    A verse asked for twice (overlapping ranges) is sent once, at its first position.
+    """
+    ranges = parse_refs(refs)
+    names = parse_fields(fields)
+    selected = parse_translations(db, translations)
+    return StreamingResponse(
+        stream_verses(ranges, names, selected),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": f"public, max-age={API_MAX_AGE}"},
+    )
+
+def stream_verses(ranges, names, translations=()):
+    # Own session: dependency sessions are closed before a streamed body is sent
+    db = ReadSessionLocal()
+    try:
+        sent = set()
+        if ranges:
+            # Order by the position of the matching range, then by verse
+            position = case(
+                *[(and_(Ayat.surah_number == s, Ayat.ayat_number.between(first, last)), i)
+                  for i, (s, first, last) in enumerate(ranges)]
+            )
+            query = verse_query(db, names, translations).filter(ranges_filter(ranges)).order_by(
+                position, Ayat.ayat_number
+            )
+            rows = iter(query.yield_per(200))
+            # One translation lookup per 200 verses
+            while chunk := list(islice(rows, 200)):
+                for row, verse in zip(chunk, verse_dicts(db, names, chunk, translations)):
+                    sent.add((row[0], row[1]))
+                    yield dumps(verse) + b"\n"
+        missing = [f"{s}:{a}" for s, a in expand_refs(ranges) if (s, a) not in sent]
+        if missing:
+            yield dumps({"missing": missing}) + b"\n"
+    finally:
+        db.close()
@@ -0,0 +1,78 @@
+"""
+Reading in revelation (nüzul) order.
+
+Pages are fixed-size slices of utils.CHRONOLOGICAL_ORDER, so a page is one
+indexed lookup on absolute_number and the verse before or after any verse
+is an array access, never a sorting query.
+"""
+import os
+from math import ceil
+
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy.orm import Session
+from database import get_read_db
+from models import Ayat
+from templating import templates
+from compression import page_cache
+from translations import reader_translations, translation_ids, first_texts
+from utils import (
+    SURAH_NAMES, TOTAL_AYATS, CHRONOLOGICAL_ORDER, CHRONOLOGICAL_POSITION,
+    absolute_number, chronological_neighbors, surah_sections,
+)
+
+CHRONOLOGICAL_PAGE_SIZE = int(os.getenv("CHRONOLOGICAL_PAGE_SIZE", "50"))
+PAGE_COUNT = ceil(TOTAL_AYATS / CHRONOLOGICAL_PAGE_SIZE)
+
+router = APIRouter()
+
+def page_of(number) -> int:
+    """The /chronological page holding an absolute verse number"""
+    return CHRONOLOGICAL_POSITION[number] // CHRONOLOGICAL_PAGE_SIZE + 1
+
+@router.get("/chronological", response_class=HTMLResponse)
+async def read_chronological(
+    request: Request,
+    page: int = 1,
+    db: Session = Depends(get_read_db),
+    translations: tuple = Depends(reader_translations)
+):
+    page = min(max(page, 1), PAGE_COUNT)
+    cached = page_cache.get_or_render(
+        ("chronological", page, translation_ids(translations[:1])),
+        lambda: render_chronological(db, page, translations)
+    )
+    return cached.response(request)
+
+def render_chronological(db: Session, page: int, translations=()) -> str:
+    numbers = CHRONOLOGICAL_ORDER[(page - 1) * CHRONOLOGICAL_PAGE_SIZE:page * CHRONOLOGICAL_PAGE_SIZE]
+    by_number = {ayat.absolute_number: ayat for ayat in db.query(Ayat).filter(Ayat.absolute_number.in_(numbers))}
+    sections = surah_sections(by_number[number] for number in numbers if number in by_number)
+
+    return templates.get_template("chronological.html").render({
+        "page": page,
+        "page_count": PAGE_COUNT,
+        "sections": sections,
+        "texts": first_texts(db, [ayat.id for ayat in by_number.values()], translations),
+        "surah_names": SURAH_NAMES,
+    })
+
+@router.get("/chronological/verse/{surah_number}/{ayat_number}")
+async def chronological_verse(surah_number: int, ayat_number: int):
+    """Open the revelation-order page holding a verse, scrolled to it"""
+    number = absolute_number(surah_number, ayat_number)
+    if number is None:
+        return RedirectResponse(url="/chronological", status_code=303)
+    return RedirectResponse(
+        url=f"/chronological?page={page_of(number)}#ayat-{surah_number}-{ayat_number}", status_code=303
+    )
+
+@router.get("/chronological/next/{surah_number}/{ayat_number}")
+async def chronological_next(surah_number: int, ayat_number: int):
+    _, following = chronological_neighbors(surah_number, ayat_number)
+    return await chronological_verse(*(following or (surah_number, ayat_number)))
+
+@router.get("/chronological/previous/{surah_number}/{ayat_number}")
+async def chronological_previous(surah_number: int, ayat_number: int):
+    previous, _ = chronological_neighbors(surah_number, ayat_number)
+    return await chronological_verse(*(previous or (surah_number, ayat_number)))
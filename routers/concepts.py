@@ -1,28 +1,44 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from database import get_db
-from models import Concept
+from database import get_read_db
+from models import Ayat, Concept, ayat_concept_association as ayat_concept
+from templating import templates
+from compression import page_cache
+from translations import reader_translations, translation_ids, first_texts
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 @router.get("/concepts", response_class=HTMLResponse)
-async def read_concepts(request: Request, db: Session = Depends(get_db)):
-    concepts = db.query(Concept).all()
-    return templates.TemplateResponse("concept_list.html", {
-        "request": request, 
-        "concepts": concepts
-    })
+async def read_concepts(request: Request, db: Session = Depends(get_read_db)):
+    page = page_cache.get_or_render(("concepts",), lambda: templates.get_template("concept_list.html").render(
+        concepts=db.query(Concept).all(),
+        counts=dict(db.execute(
+            select(ayat_concept.c.concept_id, func.count()).group_by(ayat_concept.c.concept_id)
+        ).all()),
+    ))
+    return page.response(request)
 
 @router.get("/concept/{concept_id}", response_class=HTMLResponse)
-async def read_concept_detail(request: Request, concept_id: int, db: Session = Depends(get_db)):
-    concept = db.query(Concept).filter(Concept.id == concept_id).first()
-    # Loading relationship eagerly or lazily (lazy is default)
-    # The template will access concept.ayats
-    
-    return templates.TemplateResponse("concept_detail.html", {
-        "request": request,
-        "concept": concept
-    })
+async def read_concept_detail(request: Request, concept_id: int, db: Session = Depends(get_read_db),
+                              translations: tuple = Depends(reader_translations)):
+    page = page_cache.get_or_render(
+        ("concept", concept_id, translation_ids(translations[:1])),
+        lambda: render_concept(db, concept_id, translations)
+    )
+    return page.response(request)
+
+def render_concept(db: Session, concept_id: int, translations=()) -> str:
+    # Seeds and the strongest tag_concepts.py links first, one index range scan
+    links = db.execute(
+        select(Ayat, ayat_concept.c.source, ayat_concept.c.confidence)
+        .join(ayat_concept, ayat_concept.c.ayat_id == Ayat.id)
+        .where(ayat_concept.c.concept_id == concept_id)
+        .order_by(ayat_concept.c.confidence.desc(), Ayat.absolute_number)
+    ).all()
+    return templates.get_template("concept_detail.html").render(
+        concept=db.query(Concept).filter(Concept.id == concept_id).first(),
+        links=links,
+        texts=first_texts(db, [ayat.id for ayat, _, _ in links], translations),
+    )
@@ -0,0 +1,69 @@
+"""
+Juz, hizb quarter and Mushaf page views.
+
+Each part resolves to a contiguous absolute_number range (see mushaf.py),
+read with one range scan on the absolute_number index.
+"""
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import HTMLResponse
+from sqlalchemy.orm import Session
+from database import get_read_db
+from models import Ayat
+from templating import templates
+from compression import page_cache
+from mushaf import DIVISIONS, boundaries
+from translations import reader_translations, translation_ids, first_texts
+from utils import SURAH_NAMES, surah_sections
+
+router = APIRouter()
+
+def part_title(division: str, n: int) -> str:
+    if division == "juz":
+        return f"{n}. Cüz"
+    if division == "hizb":
+        return f"{(n - 1) // 4 + 1}. Hizb, {(n - 1) % 4 + 1}/4"
+    return f"Sayfa {n}"
+
+def read_part(request: Request, db: Session, division: str, n: int, translations):
+    verse_range = boundaries.verse_range(db, division, n)
+    if verse_range is None:
+        raise HTTPException(status_code=404, detail="Bölüm bulunamadı")
+    page = page_cache.get_or_render(
+        (division, n, translation_ids(translations[:1])),
+        lambda: render_part(db, division, n, verse_range, translations)
+    )
+    return page.response(request)
+
+def render_part(db: Session, division: str, n: int, verse_range, translations=()) -> str:
+    first, last = verse_range
+    ayats = (
+        db.query(Ayat)
+        .filter(Ayat.absolute_number.between(first, last))
+        .order_by(Ayat.absolute_number)
+        .all()
+    )
+    return templates.get_template("mushaf_part.html").render({
+        "division": division,
+        "n": n,
+        "title": part_title(division, n),
+        "part_count": DIVISIONS[division],
+        "sections": surah_sections(ayats),
+        "texts": first_texts(db, [ayat.id for ayat in ayats], translations),
+        "surah_names": SURAH_NAMES,
+    })
+
+@router.get("/juz/{n}", response_class=HTMLResponse)
+async def read_juz(request: Request, n: int, db: Session = Depends(get_read_db),
+                   translations: tuple = Depends(reader_translations)):
+    return read_part(request, db, "juz", n, translations)
+
+@router.get("/hizb/{n}", response_class=HTMLResponse)
+async def read_hizb_quarter(request: Request, n: int, db: Session = Depends(get_read_db),
+                            translations: tuple = Depends(reader_translations)):
+    """n is the hizb quarter (rub'), 1-240"""
+    return read_part(request, db, "hizb", n, translations)
+
+@router.get("/page/{n}", response_class=HTMLResponse)
+async def read_page(request: Request, n: int, db: Session = Depends(get_read_db),
+                    translations: tuple = Depends(reader_translations)):
+    return read_part(request, db, "page", n, translations)
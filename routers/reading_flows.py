@@ -1,25 +1,63 @@
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_read_db
 from models import ReadingFlow
+from templating import templates
+from compression import page_cache
+from flow_generator import graph, flow_length, verse_flow, concept_flow
+from translations import reader_translations, translation_ids, first_texts
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 @router.get("/reading-flows", response_class=HTMLResponse)
-async def read_reading_flows(request: Request, db: Session = Depends(get_db)):
-    flows = db.query(ReadingFlow).all()
-    return templates.TemplateResponse("reading_flows.html", {
-        "request": request,
-        "flows": flows
-    })
+async def read_reading_flows(request: Request, db: Session = Depends(get_read_db)):
+    page = page_cache.get_or_render(("reading-flows",), lambda: templates.get_template("reading_flows.html").render(
+        flows=db.query(ReadingFlow).all()
+    ))
+    return page.response(request)
 
 @router.get("/reading-flow/{flow_id}", response_class=HTMLResponse)
-async def read_reading_flow_detail(request: Request, flow_id: int, db: Session = Depends(get_db)):
-    flow = db.query(ReadingFlow).filter(ReadingFlow.id == flow_id).first()
-    return templates.TemplateResponse("reading_flow_detail.html", {
-        "request": request,
-        "flow": flow
-    })
+async def read_reading_flow_detail(request: Request, flow_id: int, db: Session = Depends(get_read_db),
+                                   translations: tuple = Depends(reader_translations)):
+    page = page_cache.get_or_render(
+        ("reading-flow", flow_id, translation_ids(translations[:1])),
+        lambda: render_reading_flow(db, flow_id, translations)
+    )
+    return page.response(request)
+
+def render_reading_flow(db: Session, flow_id: int, translations=()) -> str:
+    return render_flow(db, db.query(ReadingFlow).filter(ReadingFlow.id == flow_id).first(), translations)
+
+def render_flow(db: Session, flow, translations=()) -> str:
+    return templates.get_template("reading_flow_detail.html").render(
+        flow=flow,
+        texts=first_texts(db, [step.ayat_id for step in flow.steps] if flow else [], translations),
+    )
+
+def render_generated(db: Session, flow, detail: str, translations) -> str:
+    if flow is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return render_flow(db, flow, translations)
+
+@router.get("/reading-flow/verse/{surah_number}/{ayat_number}", response_class=HTMLResponse)
+async def read_verse_flow(request: Request, surah_number: int, ayat_number: int, steps: int = None,
+                          db: Session = Depends(get_read_db), translations: tuple = Depends(reader_translations)):
+    """A flow through the relation graph starting at a verse, generated on a cache miss"""
+    length = flow_length(steps)
+    page = page_cache.get_or_render(
+        ("verse-flow", surah_number, ayat_number, length, graph.generation, translation_ids(translations[:1])),
+        lambda: render_generated(db, verse_flow(db, surah_number, ayat_number, length), "Ayet bulunamadı", translations)
+    )
+    return page.response(request)
+
+@router.get("/reading-flow/concept/{concept_id}", response_class=HTMLResponse)
+async def read_concept_flow(request: Request, concept_id: int, steps: int = None,
+                            db: Session = Depends(get_read_db), translations: tuple = Depends(reader_translations)):
+    """A flow through a concept's verses and their relations, generated on a cache miss"""
+    length = flow_length(steps)
+    page = page_cache.get_or_render(
+        ("concept-flow", concept_id, length, graph.generation, translation_ids(translations[:1])),
+        lambda: render_generated(db, concept_flow(db, concept_id, length), "Kavram bulunamadı", translations)
+    )
+    return page.response(request)
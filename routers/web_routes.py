@@ -1,33 +1,30 @@
+from urllib.parse import urlencode
+
 from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Ayat, Reflection, Favorite, UserPreference
-from utils import get_surah_list, SURAH_NAMES
+from sqlalchemy.orm import Session, selectinload
+from database import get_db, get_read_db
+from models import Ayat, Reflection, Favorite, REFERENCE_SIMILAR, REFERENCE_THEME, REFERENCE_TAFSIR
+from relations import surah_references, verse_references
+from utils import get_surah_list, SURAH_NAMES, SURAH_AYAT_COUNTS, REVELATION_RANK, absolute_number, juz_of
+from templating import templates
+from compression import page_cache
+from counters import increment, get_count
+from favorites import favorite_bits, toggle
+from paging import keyset_page
+from preferences import get_preference, set_preferences
+from search import search_reflections
+from translations import reader_translations, translation_ids, verse_texts, first_texts
+from users import current_user_id, require_user
+from visits import visits
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
-
-# Helper to get/set user preferences
-def get_preference(db: Session, key: str) -> str:
-    pref = db.query(UserPreference).filter(UserPreference.key == key).first()
-    return pref.value if pref else None
-
-def set_preference(db: Session, key: str, value: str):
-    pref = db.query(UserPreference).filter(UserPreference.key == key).first()
-    if pref:
-        pref.value = value
-    else:
-        pref = UserPreference(key=key, value=value)
-        db.add(pref)
-    db.commit()
 
 @router.get("/", response_class=HTMLResponse)
-async def read_home(request: Request, db: Session = Depends(get_db)):
+async def read_home(request: Request, db: Session = Depends(get_db), user_id: int = Depends(current_user_id)):
     # Get last read position
-    last_surah = get_preference(db, "last_read_surah")
-    last_ayat = get_preference(db, "last_read_ayat")
+    last_surah = get_preference(db, user_id, "last_read_surah")
+    last_ayat = get_preference(db, user_id, "last_read_ayat")
     
     return templates.TemplateResponse("index.html", {
         "request": request, 
@@ -37,110 +34,106 @@ async def read_home(request: Request, db: Session = Depends(get_db)):
     })
 
 @router.get("/surah/{surah_number}", response_class=HTMLResponse)
-async def read_surah(request: Request, surah_number: int, db: Session = Depends(get_db)):
+async def read_surah(
+    request: Request,
+    surah_number: int,
+    db: Session = Depends(get_read_db),
+    user_db: Session = Depends(get_db),
+    user_id: int = Depends(current_user_id),
+    translations: tuple = Depends(reader_translations)
+):
+    # Update last read position and the visit count (written by visits' flush thread)
+    position = {"last_read_surah": str(surah_number)}
+    if surah_number in SURAH_NAMES:
+        visits.record(surah_number)
+        position["last_read_ayat"] = "1"
+    set_preferences(user_db, user_id, position)
+    user_db.commit()
+
+    return surah_page(db, user_db, user_id, surah_number, translations).response(request)
+
+def surah_page(db: Session, user_db: Session, user_id: int, surah_number: int, translations):
+    """
+    The cached surah page as seen by a user. The key holds the user's
+    favorites within the surah and the ids of their translations, so users
+    with the same ones (most often none and the defaults) share one page,
+    and a toggle leads to a different key.
+    """
+    favorites = ()
+    if surah_number in SURAH_NAMES and user_id is not None:
+        favorites = favorite_bits.get(user_id).numbers_between(
+            user_db, absolute_number(surah_number, 1),
+            absolute_number(surah_number, SURAH_AYAT_COUNTS[surah_number - 1]),
+        )
+    return page_cache.get_or_render(
+        ("surah", surah_number, favorites, translation_ids(translations)),
+        lambda: render_surah(db, surah_number, favorites, translations)
+    )
+
+def render_surah(db: Session, surah_number: int, favorite_numbers=(), translations=()) -> str:
+    # Corpus data comes from the read pool/replica; favorites from the caller
     from models import NuzulSebebi
-    from sqlalchemy import text
     
     ayats = db.query(Ayat).filter(Ayat.surah_number == surah_number).order_by(Ayat.ayat_number).all()
     surah_name = SURAH_NAMES.get(surah_number, f"Sure {surah_number}")
     
-    # Get favorite ayat IDs for this surah
-    favorite_ids = set(
-        f.ayat_id for f in db.query(Favorite).join(Ayat).filter(Ayat.surah_number == surah_number).all()
-    )
+    favorite_ids = {ayat.id for ayat in ayats if ayat.absolute_number in favorite_numbers}
     
     # Get Nuzul Sebebi data for this surah (indexed by ayat number)
     nuzul_list = db.query(NuzulSebebi).filter(NuzulSebebi.surah_number == surah_number).all()
     nuzul_map = {ns.ayat_number: ns.text_en for ns in nuzul_list}
     
-    # Get Similar Verses (Mutashabihat) for this surah - word similarity
+    # Cross-references leaving this surah's verses: word similarity (Mutashabihat),
+    # meaning similarity (QurSim) and tafsir references, in one indexed join
     similar_map = {}
-    try:
-        result = db.execute(text(
-            "SELECT source_ayat, target_surah, target_ayat FROM similar_ayat WHERE source_surah = :surah"
-        ), {"surah": surah_number})
-        for row in result:
-            source_ayat = row[0]
-            if source_ayat not in similar_map:
-                similar_map[source_ayat] = []
-            similar_map[source_ayat].append({"surah": row[1], "ayat": row[2]})
-    except:
-        pass  # Table may not exist yet
-    
-    # REVERSE: Get verses that reference THIS surah's verses (bidirectional)
-    referenced_by_map = {}
-    try:
-        result = db.execute(text(
-            "SELECT target_ayat, source_surah, source_ayat FROM similar_ayat WHERE target_surah = :surah"
-        ), {"surah": surah_number})
-        for row in result:
-            target_ayat = row[0]
-            if target_ayat not in referenced_by_map:
-                referenced_by_map[target_ayat] = []
-            referenced_by_map[target_ayat].append({"surah": row[1], "ayat": row[2], "type": "kelime"})
-        
-        # Also add semantic reverse references
-        result2 = db.execute(text(
-            "SELECT target_ayat, source_surah, source_ayat FROM semantic_similarity WHERE target_surah = :surah"
-        ), {"surah": surah_number})
-        for row in result2:
-            target_ayat = row[0]
-            if target_ayat not in referenced_by_map:
-                referenced_by_map[target_ayat] = []
-            referenced_by_map[target_ayat].append({"surah": row[1], "ayat": row[2], "type": "anlam"})
-    except:
-        pass
-    
-    # Get Semantic Similarity (QurSim) for this surah - meaning similarity
     semantic_map = {}
-    try:
-        result = db.execute(text(
-            "SELECT source_ayat, target_surah, target_ayat, similarity_degree FROM semantic_similarity WHERE source_surah = :surah"
-        ), {"surah": surah_number})
-        for row in result:
-            source_ayat = row[0]
-            if source_ayat not in semantic_map:
-                semantic_map[source_ayat] = []
-            semantic_map[source_ayat].append({"surah": row[1], "ayat": row[2], "degree": row[3]})
-    except:
-        pass  # Table may not exist yet
-    
-    # Get Tafsir References for this surah
     tafsir_map = {}
-    try:
-        result = db.execute(text(
-            "SELECT source_ayat, target_surah, target_ayat, mufassir, note_tr FROM tafsir_reference WHERE source_surah = :surah"
-        ), {"surah": surah_number})
-        for row in result:
-            source_ayat = row[0]
-            if source_ayat not in tafsir_map:
-                tafsir_map[source_ayat] = []
-            tafsir_map[source_ayat].append({
-                "surah": row[1], 
-                "ayat": row[2], 
-                "mufassir": row[3],
-                "note": row[4]
+    for ayat_number, surah, ayat, ref_type, degree, mufassir, note in surah_references(db, surah_number):
+        if ref_type == REFERENCE_SIMILAR:
+            similar_map.setdefault(ayat_number, []).append({"surah": surah, "ayat": ayat})
+        elif ref_type == REFERENCE_THEME:
+            semantic_map.setdefault(ayat_number, []).append({"surah": surah, "ayat": ayat, "degree": degree})
+        elif ref_type == REFERENCE_TAFSIR:
+            tafsir_map.setdefault(ayat_number, []).append({
+                "surah": surah,
+                "ayat": ayat,
+                "mufassir": mufassir,
+                "note": note
             })
-    except:
-        pass
     
-    # Update last read position
-    set_preference(db, "last_read_surah", str(surah_number))
-    if ayats:
-        set_preference(db, "last_read_ayat", str(ayats[0].ayat_number))
+    # REVERSE: verses that reference THIS surah's verses (bidirectional), including
+    # tafsir citations made from other verses, through the target-side index
+    referenced_by_map = {}
+    for ayat_number, surah, ayat, ref_type, _, mufassir, note in surah_references(db, surah_number, "incoming"):
+        if ref_type == REFERENCE_TAFSIR:
+            referenced_by_map.setdefault(ayat_number, []).append({
+                "surah": surah,
+                "ayat": ayat,
+                "type": "tefsir",
+                "mufassir": mufassir,
+                "note": note
+            })
+        else:
+            referenced_by_map.setdefault(ayat_number, []).append({
+                "surah": surah,
+                "ayat": ayat,
+                "type": "kelime" if ref_type == REFERENCE_SIMILAR else "anlam"
+            })
     
-    return templates.TemplateResponse("surah_detail.html", {
-        "request": request,
+    return templates.get_template("surah_detail.html").render({
         "surah_number": surah_number,
         "surah_name": surah_name,
+        "revelation_rank": REVELATION_RANK[surah_number - 1] if surah_number in SURAH_NAMES else None,
         "ayats": ayats,
+        "texts": verse_texts(db, [ayat.id for ayat in ayats], translations),
         "favorite_ids": favorite_ids,
         "nuzul_map": nuzul_map,
         "similar_map": similar_map,
         "semantic_map": semantic_map,
         "referenced_by_map": referenced_by_map,
         "tafsir_map": tafsir_map,
-        "surah_names": SURAH_NAMES
+        "surah_names": SURAH_NAMES,
+        "juz_of": juz_of
     })
 
 @router.post("/reflection/add", response_class=HTMLResponse)
@@ -150,47 +143,115 @@ def add_reflection(
     content: str = Form(...),
     next_url: str = Form(...),
     concept_tag: str = Form(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user_id: int = Depends(require_user)
 ):
-    reflection = Reflection(ayat_id=ayat_id, text_content=content, concept_tag=concept_tag)
+    reflection = Reflection(user_id=user_id, ayat_id=ayat_id, text_content=content, concept_tag=concept_tag)
     db.add(reflection)
+    increment(db, "reflections", user_id)
     db.commit()
     return RedirectResponse(url=next_url, status_code=303)
 
 @router.get("/reflections", response_class=HTMLResponse)
-async def read_reflections(request: Request, db: Session = Depends(get_db)):
-    reflections = db.query(Reflection).order_by(Reflection.created_at.desc()).all()
-    return templates.TemplateResponse("reflections.html", {
+async def read_reflections(
+    request: Request,
+    cursor: str = None,
+    partial: bool = False,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(require_user)
+):
+    """Newest reflections first, one keyset page at a time; partial=1 returns only the entries"""
+    reflections, next_cursor = keyset_page(
+        db.query(Reflection).options(selectinload(Reflection.ayat)).filter(Reflection.user_id == user_id),
+        Reflection, cursor
+    )
+    return templates.TemplateResponse("_reflection_items.html" if partial else "reflections.html", {
+        "request": request,
+        "reflections": reflections,
+        "next_cursor": next_cursor,
+        "page_url": "/reflections?",
+        "search": {},
+        "surah_names": SURAH_NAMES,
+        "total": None if partial else get_count(db, "reflections", user_id)
+    })
+
+@router.get("/reflections/search", response_class=HTMLResponse)
+async def search_reflections_page(
+    request: Request,
+    q: str = None,
+    tag: str = None,
+    surah: str = None,
+    cursor: str = None,
+    partial: bool = False,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(require_user)
+):
+    """Full-text search over the journal, filtered by tag and surah"""
+    # The form sends empty strings for unused filters
+    search = {
+        "q": (q or "").strip(),
+        "tag": (tag or "").strip(),
+        "surah": int(surah) if surah and surah.isdigit() else None,
+    }
+    search = {key: value for key, value in search.items() if value}
+    reflections, next_cursor = search_reflections(
+        db, user_id, cursor=cursor, options=[selectinload(Reflection.ayat)], **search
+    )
+    return templates.TemplateResponse("_reflection_items.html" if partial else "reflections.html", {
         "request": request,
-        "reflections": reflections
+        "reflections": reflections,
+        "next_cursor": next_cursor,
+        "page_url": f"/reflections/search?{urlencode(search)}&" if search else "/reflections/search?",
+        "search": search,
+        "surah_names": SURAH_NAMES,
+        "total": None
     })
 
 @router.post("/favorite/toggle")
 def toggle_favorite(
     ayat_id: int = Form(...),
     next_url: str = Form(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user_id: int = Depends(require_user)
 ):
-    existing = db.query(Favorite).filter(Favorite.ayat_id == ayat_id).first()
-    if existing:
-        db.delete(existing)
-    else:
-        db.add(Favorite(ayat_id=ayat_id))
-    db.commit()
+    # Surah pages are cached per favorite set (see surah_page), so none is stale
+    absolute = db.query(Ayat.absolute_number).filter(Ayat.id == ayat_id).scalar()
+    if absolute:
+        toggle(db, user_id, ayat_id, absolute)
     return RedirectResponse(url=next_url, status_code=303)
 
 @router.get("/favorites", response_class=HTMLResponse)
-async def read_favorites(request: Request, db: Session = Depends(get_db)):
-    favorites = db.query(Favorite).order_by(Favorite.created_at.desc()).all()
-    return templates.TemplateResponse("favorites.html", {
+async def read_favorites(
+    request: Request,
+    cursor: str = None,
+    partial: bool = False,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(require_user),
+    translations: tuple = Depends(reader_translations)
+):
+    """Newest favorites first, one keyset page at a time; partial=1 returns only the entries"""
+    favorites, next_cursor = keyset_page(
+        db.query(Favorite).options(selectinload(Favorite.ayat)).filter(Favorite.user_id == user_id),
+        Favorite, cursor
+    )
+    return templates.TemplateResponse("_favorite_items.html" if partial else "favorites.html", {
         "request": request,
-        "favorites": favorites
+        "favorites": favorites,
+        "texts": first_texts(db, [favorite.ayat_id for favorite in favorites], translations),
+        "next_cursor": next_cursor,
+        "total": None if partial else get_count(db, "favorites", user_id)
     })
 
 @router.get("/verse-graph/{surah_number}/{ayat_number}", response_class=HTMLResponse)
-async def verse_graph(request: Request, surah_number: int, ayat_number: int, db: Session = Depends(get_db)):
+async def verse_graph(request: Request, surah_number: int, ayat_number: int, db: Session = Depends(get_read_db)):
     """Interactive D3.js graph showing verse relationships"""
-    from sqlalchemy import text
+    page = page_cache.get_or_render(
+        ("verse-graph", surah_number, ayat_number),
+        lambda: render_verse_graph(db, surah_number, ayat_number)
+    )
+    return page.response(request)
+
+def render_verse_graph(db: Session, surah_number: int, ayat_number: int) -> str:
     import json
     
     surah_name = SURAH_NAMES.get(surah_number, f"Sure {surah_number}")
@@ -210,65 +271,28 @@ async def verse_graph(request: Request, surah_number: int, ayat_number: int, db:
     })
     node_ids.add(center_id)
     
-    # Get outgoing kelime similarity (this verse -> others)
-    try:
-        result = db.execute(text(
-            "SELECT target_surah, target_ayat FROM similar_ayat WHERE source_surah = :s AND source_ayat = :a"
-        ), {"s": surah_number, "a": ayat_number})
-        for row in result:
-            target_id = f"{row[0]}:{row[1]}"
-            if target_id not in node_ids:
-                nodes.append({"id": target_id, "label": target_id, "surah": row[0], "ayat": row[1], "type": "kelime"})
-                node_ids.add(target_id)
-            links.append({"source": center_id, "target": target_id, "type": "kelime"})
-    except:
-        pass
-    
-    # Get outgoing semantic similarity
-    try:
-        result = db.execute(text(
-            "SELECT target_surah, target_ayat FROM semantic_similarity WHERE source_surah = :s AND source_ayat = :a"
-        ), {"s": surah_number, "a": ayat_number})
-        for row in result:
-            target_id = f"{row[0]}:{row[1]}"
-            if target_id not in node_ids:
-                nodes.append({"id": target_id, "label": target_id, "surah": row[0], "ayat": row[1], "type": "anlam"})
-                node_ids.add(target_id)
-            links.append({"source": center_id, "target": target_id, "type": "anlam"})
-    except:
-        pass
+    # Outgoing (this verse -> others): kelime and anlam similarity, tafsir references
+    link_types = {REFERENCE_SIMILAR: "kelime", REFERENCE_THEME: "anlam", REFERENCE_TAFSIR: "tefsir"}
+    for _, surah, ayat, ref_type, *_ in verse_references(db, surah_number, ayat_number):
+        link_type = link_types[ref_type]
+        target_id = f"{surah}:{ayat}"
+        if target_id not in node_ids:
+            nodes.append({"id": target_id, "label": target_id, "surah": surah, "ayat": ayat, "type": link_type})
+            node_ids.add(target_id)
+        links.append({"source": center_id, "target": target_id, "type": link_type})
     
-    # Get incoming references (others -> this verse)
-    try:
-        result = db.execute(text(
-            "SELECT source_surah, source_ayat FROM similar_ayat WHERE target_surah = :s AND target_ayat = :a"
-        ), {"s": surah_number, "a": ayat_number})
-        for row in result:
-            source_id = f"{row[0]}:{row[1]}"
-            if source_id not in node_ids:
-                nodes.append({"id": source_id, "label": source_id, "surah": row[0], "ayat": row[1], "type": "ref"})
-                node_ids.add(source_id)
-            links.append({"source": source_id, "target": center_id, "type": "ref"})
-    except:
-        pass
-    
-    try:
-        result = db.execute(text(
-            "SELECT source_surah, source_ayat FROM semantic_similarity WHERE target_surah = :s AND target_ayat = :a"
-        ), {"s": surah_number, "a": ayat_number})
-        for row in result:
-            source_id = f"{row[0]}:{row[1]}"
-            if source_id not in node_ids:
-                nodes.append({"id": source_id, "label": source_id, "surah": row[0], "ayat": row[1], "type": "ref"})
-                node_ids.add(source_id)
-            links.append({"source": source_id, "target": center_id, "type": "ref"})
-    except:
-        pass
+    # Incoming references (others -> this verse); tafsir citations keep their own colour
+    for _, surah, ayat, ref_type, *_ in verse_references(db, surah_number, ayat_number, "incoming"):
+        link_type = "tefsir" if ref_type == REFERENCE_TAFSIR else "ref"
+        source_id = f"{surah}:{ayat}"
+        if source_id not in node_ids:
+            nodes.append({"id": source_id, "label": source_id, "surah": surah, "ayat": ayat, "type": link_type})
+            node_ids.add(source_id)
+        links.append({"source": source_id, "target": center_id, "type": link_type})
     
     graph_data = json.dumps({"nodes": nodes, "links": links})
     
-    return templates.TemplateResponse("verse_graph.html", {
-        "request": request,
+    return templates.get_template("verse_graph.html").render({
         "surah_number": surah_number,
         "ayat_number": ayat_number,
         "surah_name": surah_name,
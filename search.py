@@ -0,0 +1,47 @@
+"""
+Full-text search over the reflection journal.
+
+SQLite uses the reflection_fts FTS5 table and Postgres a GIN expression
+index, both created by migration 0004 and kept current on every write, so a
+new reflection is searchable at once and a lookup costs an index probe rather
+than a scan. Every word of the query must match, as a prefix ("sab" finds
+"sabır"). Results are the user's own, paged newest first like /reflections.
+"""
+import re
+
+from sqlalchemy import func, select, text
+
+from database import IS_SQLITE
+from models import Ayat, Reflection
+from paging import keyset_page
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def query_words(q: str) -> list:
+    return _WORD.findall(q or "")
+
+def _match(words):
+    """A filter on Reflection.id matching every word as a prefix"""
+    if IS_SQLITE:
+        # Quoted, so user input can't inject FTS5 query syntax
+        fts_query = " ".join(f'"{word}"*' for word in words)
+        return Reflection.id.in_(
+            select(text("rowid")).select_from(text("reflection_fts"))
+            .where(text("reflection_fts MATCH :fts_query").bindparams(fts_query=fts_query))
+        )
+    # Must stay identical to the expression of ix_reflection_search
+    document = func.to_tsvector("simple", Reflection.text_content + " " + func.coalesce(Reflection.concept_tag, ""))
+    ts_query = " & ".join(f"{word}:*" for word in words)
+    return document.op("@@")(func.to_tsquery("simple", ts_query))
+
+def search_reflections(db, user_id, q=None, tag=None, surah=None, cursor=None, options=()):
+    """One page of a user's reflections matching q, tag and surah. Returns (rows, next_cursor)."""
+    query = db.query(Reflection).options(*options).filter(Reflection.user_id == user_id)
+    words = query_words(q)
+    if words:
+        query = query.filter(_match(words))
+    if tag:
+        query = query.filter(Reflection.concept_tag == tag)
+    if surah:
+        query = query.filter(Reflection.ayat_id.in_(select(Ayat.id).where(Ayat.surah_number == surah)))
+    return keyset_page(query, Reflection, cursor)
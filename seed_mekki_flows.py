@@ -2,19 +2,59 @@
 Seed script for Mekki/Medeni information and sample reading flows.
 Run this after import_data.py to add additional metadata.
 """
+from sqlalchemy import case, update
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine, Base
 from models import Ayat, ReadingFlow, ReadingFlowStep
+from utils import MEKKI_SURAHS, absolute_number
 
-# Mekki surah numbers (traditional classification)
-MEKKI_SURAHS = {
-    1, 6, 7, 10, 11, 12, 14, 15, 16, 17, 18, 19, 20, 21, 23, 25, 26, 27, 28, 29, 
-    30, 31, 32, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 50, 51, 52, 
-    53, 54, 56, 67, 68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82, 
-    83, 84, 85, 86, 87, 88, 89, 90, 91, 92, 93, 94, 95, 96, 97, 100, 101, 102, 
-    103, 104, 105, 106, 107, 109, 111, 112, 113, 114
+# Medeni verses inside Mekki surahs, as noted in the surah headers of the
+# 1924 Cairo edition: {surah: [(first_ayat, last_ayat), ...]}
+MEDENI_VERSES = {
+    6: [(20, 20), (23, 23), (91, 91), (93, 93), (114, 114), (141, 141), (151, 153)],
+    7: [(163, 170)],
+    10: [(40, 40), (94, 96)],
+    11: [(12, 12), (17, 17), (114, 114)],
+    12: [(1, 3), (7, 7)],
+    14: [(28, 29)],
+    16: [(126, 128)],
+    17: [(26, 26), (32, 33), (57, 57), (73, 80)],
+    18: [(28, 28), (83, 101)],
+    19: [(58, 58), (71, 71)],
+    20: [(130, 131)],
+    25: [(68, 70)],
+    26: [(197, 197), (224, 227)],
+    28: [(52, 55), (85, 85)],
+    29: [(1, 11)],
+    30: [(17, 17)],
+    31: [(27, 29)],
+    32: [(16, 20)],
+    34: [(6, 6)],
+    36: [(45, 45)],
+    39: [(52, 54)],
+    40: [(56, 57)],
+    42: [(24, 27)],
+    45: [(14, 14)],
+    46: [(10, 10), (15, 15), (35, 35)],
+    50: [(38, 38)],
+    53: [(32, 32)],
+    54: [(44, 46)],
+    56: [(81, 82)],
+    68: [(17, 33), (48, 50)],
+    73: [(10, 11), (20, 20)],
+    77: [(48, 48)],
 }
 
+def load_mekki_rows():
+    """One row per surah: its classification and its Medeni verse ranges"""
+    return [
+        {
+            "surah": surah,
+            "mekki": surah in MEKKI_SURAHS,
+            "medeni_verses": MEDENI_VERSES.get(surah, []) if surah in MEKKI_SURAHS else [],
+        }
+        for surah in range(1, 115)
+    ]
+
 # Sample reading flows with reflection questions
 READING_FLOWS = [
     {
@@ -50,69 +90,84 @@ READING_FLOWS = [
     }
 ]
 
-def seed_mekki_medeni():
-    """Update all ayats with Mekki/Medeni information based on surah"""
-    db: Session = SessionLocal()
-    
+def apply_mekki_medeni(db: Session, rows):
+    """Set is_mekki on every ayat with a single UPDATE"""
     print("Updating Mekki/Medeni information...")
+    mekki_surahs = [row["surah"] for row in rows if row["mekki"]]
+    medeni_verses = [
+        absolute_number(row["surah"], ayat)
+        for row in rows
+        for first, last in row["medeni_verses"]
+        for ayat in range(first, last + 1)
+    ]
+    updated = db.execute(
+        update(Ayat).values(is_mekki=case(
+            (Ayat.absolute_number.in_(medeni_verses), False),
+            (Ayat.surah_number.in_(mekki_surahs), True),
+            else_=False,
+        ))
+    ).rowcount
     
-    # Get all unique surah numbers
-    surahs = db.query(Ayat.surah_number).distinct().all()
-    
-    for (surah_num,) in surahs:
-        is_mekki = surah_num in MEKKI_SURAHS
-        db.query(Ayat).filter(Ayat.surah_number == surah_num).update(
-            {"is_mekki": is_mekki}, 
-            synchronize_session=False
-        )
-        status = "Mekkî" if is_mekki else "Medenî"
-        print(f"  Surah {surah_num}: {status}")
-    
-    db.commit()
     print("Mekki/Medeni update completed.")
-    db.close()
+    return f"{updated} ayats, {len(medeni_verses)} Medeni verses in Mekki surahs"
 
-def seed_reading_flows():
-    """Create sample reading flows"""
-    db: Session = SessionLocal()
-    
+def apply_reading_flows(db: Session, flows):
+    """
+    Create new flows and rewrite the steps of flows whose content changed.
+    Flows are matched by title; flows missing from the source are left alone.
+    """
+    from import_pipeline import ayat_ids
     print("\nSeeding reading flows...")
+    created = updated = 0
     
-    for flow_data in READING_FLOWS:
-        # Check if flow exists
-        existing = db.query(ReadingFlow).filter(ReadingFlow.title == flow_data["title"]).first()
-        if existing:
-            print(f"  Flow exists: {flow_data['title']}")
-            continue
-        
-        flow = ReadingFlow(title=flow_data["title"], description=flow_data["description"])
-        db.add(flow)
-        db.flush()  # Get the ID
-        
-        for i, step_data in enumerate(flow_data["steps"], 1):
-            # Find the ayat
-            ayat = db.query(Ayat).filter(
-                Ayat.surah_number == step_data["surah"],
-                Ayat.ayat_number == step_data["ayat"]
-            ).first()
-            
-            if ayat:
-                step = ReadingFlowStep(
-                    flow_id=flow.id,
-                    order=i,
-                    ayat_id=ayat.id,
-                    reflection_question=step_data["question"]
-                )
-                db.add(step)
-                print(f"    Step {i}: {step_data['surah']}:{step_data['ayat']}")
+    # Resolve the ayats of every step of every flow at once
+    ids = ayat_ids(db, [(step["surah"], step["ayat"]) for flow in flows for step in flow["steps"]])
+    
+    for flow_data in flows:
+        steps = []
+        for step_data in flow_data["steps"]:
+            ayat_id = ids.get((step_data["surah"], step_data["ayat"]))
+            if ayat_id:
+                steps.append((ayat_id, step_data["question"]))
             else:
                 print(f"    Warning: Ayat {step_data['surah']}:{step_data['ayat']} not found")
         
-        db.commit()
-        print(f"  Created flow: {flow_data['title']}")
+        flow = db.query(ReadingFlow).filter(ReadingFlow.title == flow_data["title"]).first()
+        if flow is None:
+            flow = ReadingFlow(title=flow_data["title"], description=flow_data["description"])
+            db.add(flow)
+            db.flush()  # Get the ID
+            created += 1
+        elif (flow.description == flow_data["description"]
+              and [(s.ayat_id, s.reflection_question) for s in flow.steps] == steps):
+            continue
+        else:
+            flow.description = flow_data["description"]
+            for step in list(flow.steps):
+                db.delete(step)
+            db.flush()
+            updated += 1
+        
+        for i, (ayat_id, question) in enumerate(steps, 1):
+            db.add(ReadingFlowStep(
+                flow_id=flow.id,
+                order=i,
+                ayat_id=ayat_id,
+                reflection_question=question
+            ))
+        print(f"  Saved flow: {flow_data['title']} ({len(steps)} steps)")
     
     print("Reading flows seeding completed.")
-    db.close()
+    return f"+{created} ~{updated}"
+
+def seed_mekki_medeni():
+    from import_pipeline import run_pipeline
+    run_pipeline(["mekki"], force=True)
+
+def seed_reading_flows():
+    """Create sample reading flows"""
+    from import_pipeline import run_pipeline
+    run_pipeline(["reading_flows"], force=True)
 
 if __name__ == "__main__":
     seed_mekki_medeni()
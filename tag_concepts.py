@@ -0,0 +1,205 @@
+"""
+Tag verses with concepts across the whole corpus, starting from the seeds.
+
+seed_concepts.py links a handful of hand-picked verses to each concept. This
+script scores every other verse for every concept from three kinds of
+evidence:
+
+    lexical  Turkish stems in the Diyanet translation (translation_2)
+    root     Arabic roots in the verse text, matched on an index of its
+             undiacritized words
+    related  similar/theme/tefsir edges (ayat_reference) to a seed verse
+
+Verses reaching MIN_SCORE are linked in ayat_concept, at most MAX_PER_CONCEPT
+per concept, with the evidence found as their source and score / FULL_SCORE
+as their confidence. The corpus, the seeds and the edges are read with one
+query each, and every generated link is replaced in one transaction; seed
+links are never touched.
+
+Tagging is the "concept_tags" stage of import_pipeline.py: it runs again when
+the lexicons or any of its input stages change, and the server's import job
+then resets the page cache and the flow graph. Run by hand, it changes the
+database only; restart the server to show the new links.
+
+Usage:
+    python tag_concepts.py
+"""
+import re
+import time
+from bisect import bisect_left
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from classify_context import turkish_words
+from models import (
+    Ayat, Concept, ayat_concept_association as ayat_concept,
+    ayat_reference_association as reference, REFERENCE_SIMILAR, REFERENCE_THEME, REFERENCE_TAFSIR,
+)
+
+# concept name -> Turkish stems (matching any word they start), Turkish words
+# (matched whole, for short stems that start unrelated words: "hani" would
+# match "hanif") and Arabic roots (radicals in order, a long vowel allowed
+# between them; "ء" also matches alif). Keep stems long enough to name one
+# thing: "eşi" matched "eşit", "yakar" matched "yakarak" (burning).
+LEXICONS = {
+    "Allah": {"tr": ["ilah", "ilâh", "tanrı", "kayyûm", "tesbih"], "ar": ["صمد", "قيوم", "سبح"]},
+    "Rahmet": {"tr": ["rahmet", "merhamet", "rahmân", "rahman", "rahîm", "esirge", "şefkat", "lütf"], "ar": ["رحم"]},
+    "İman": {"tr": ["iman", "inan", "mümin"], "ar": ["ءمن"]},
+    "Takva": {"tr": ["takva", "sakın", "muttaki", "müttaki"], "ar": ["تقو", "متق"]},
+    "Salih Amel": {"tr": ["salih", "sâlih", "amel", "iyilik", "yararlı"], "ar": ["صلح", "عمل"]},
+    "Şirk": {"tr": ["şirk", "ortak", "müşrik", "put"], "ar": ["شرك"]},
+    "Adalet": {"tr": ["adalet", "adil", "âdil", "insaf", "ölçü", "terazi"], "ar": ["عدل", "قسط"]},
+    "Sabır": {"tr": ["sabr", "sabır", "sebat"], "ar": ["صبر"]},
+    "Dua": {"tr": ["dua", "yalvar"], "ar": ["دعو", "دعا"]},
+    "Ahiret": {"tr": ["ahiret", "âhiret", "kıyamet", "hesap", "diril"], "ar": ["اخره", "قيامه", "بعث"]},
+    "Cennet": {"tr": ["cennet", "bahçe", "ırmak"], "ar": ["جنه", "جنت"]},
+    "Cehennem": {"tr": ["cehennem", "ateş", "azap", "azab", "alev"], "ar": ["جهنم", "نار"]},
+    "Peygamberler": {"tr": ["peygamber", "elçi", "nebi", "resul", "resûl"], "ar": ["رسل", "نبي"]},
+    "Kıssalar": {"tr": ["kıssa", "kavm", "firavun"], "words": ["hani"], "ar": ["قصص", "فرعون"]},
+    "Tevekkül": {"tr": ["tevekkül", "güven", "vekil"], "ar": ["توكل", "وكيل"]},
+    "Namaz": {"tr": ["namaz", "secde", "rükû", "abdest"], "ar": ["صلو", "صلاه", "سجد"]},
+    "Zekat/İnfak": {"tr": ["zekât", "zekat", "infak", "harca", "sadaka", "yoksul"], "ar": ["زكو", "زكاه", "نفق", "صدقه"]},
+    "Tövbe": {"tr": ["tövbe", "tevbe", "bağışla", "mağfiret"], "ar": ["توب", "غفر"]},
+    "Yaratılış": {"tr": ["yarat", "balçık", "çamur", "nutfe"], "ar": ["خلق", "فطر"]},
+    "Aile": {"tr": ["anne", "baba", "evlat", "çocuk", "evlen", "nikâh", "nikah", "boşan", "akraba"], "ar": ["زوج", "نكح", "ولد"]},
+}
+
+# Points per distinct stem or root found (counted up to a cap) and per edge to a seed
+LEXICAL_POINTS, MAX_LEXICAL = 2, 3
+ROOT_POINTS, MAX_ROOTS = 2, 2
+EDGE_POINTS = {REFERENCE_SIMILAR: 2, REFERENCE_TAFSIR: 3}  # theme edges score their degree
+MAX_RELATED_POINTS = 4
+# One kind of evidence is never enough on its own, except two distinct stems or roots
+MIN_SCORE = 4
+FULL_SCORE = 10
+MAX_PER_CONCEPT = 150
+
+# Pipeline stages whose rows the tags are computed from
+TAGGING_INPUTS = ["quran", "concepts", "mutashabihat", "qursim", "tafsir"]
+
+_HARAKAT = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")  # marks and tatweel
+_ARABIC_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "ء", "ئ": "ء"})
+_ARABIC_WORD = re.compile(r"\w+", re.UNICODE)
+
+def arabic_words(text) -> list:
+    """Words of an Arabic text without diacritics, alif and hamza forms unified"""
+    return _ARABIC_WORD.findall(_HARAKAT.sub("", text or "").translate(_ARABIC_LETTERS))
+
+def root_pattern(root):
+    return re.compile("[اوي]?".join("[اء]" if letter == "ء" else letter for letter in root))
+
+class WordIndex:
+    """Distinct words of the corpus -> ids of the verses using them"""
+    def __init__(self, documents):
+        self.postings = {}
+        for ayat_id, words in documents:
+            for word in words:
+                self.postings.setdefault(word, set()).add(ayat_id)
+        self.vocabulary = sorted(self.postings)
+
+    def prefixed(self, stem) -> set:
+        """Verses with a word starting with stem; a range of the sorted vocabulary"""
+        found = set()
+        for word in self.vocabulary[bisect_left(self.vocabulary, stem):]:
+            if not word.startswith(stem):
+                break
+            found |= self.postings[word]
+        return found
+
+    def containing(self, word) -> set:
+        """Verses using exactly this word"""
+        return self.postings.get(word, set())
+
+    def matching(self, pattern) -> set:
+        found = set()
+        for word in self.vocabulary:
+            if pattern.search(word):
+                found |= self.postings[word]
+        return found
+
+def related_points(edges, seeds) -> dict:
+    """ayat id -> points for its edges (either direction) to the seed verses"""
+    points = {}
+    for source_id, target_id, reference_type, degree in edges:
+        if source_id in seeds:
+            other = target_id
+        elif target_id in seeds:
+            other = source_id
+        else:
+            continue
+        value = (degree or 1) if reference_type == REFERENCE_THEME else EDGE_POINTS.get(reference_type, 0)
+        points[other] = points.get(other, 0) + value
+    return points
+
+def score_concept(lexicon, seeds, turkish, arabic, edges) -> list:
+    """[(ayat id, score, source)] for the verses of one concept, best first"""
+    lexical, roots = {}, {}
+    found = [turkish.prefixed(stem) for stem in lexicon.get("tr", ())]
+    found += [turkish.containing(word) for word in lexicon.get("words", ())]
+    for ayat_ids in found:
+        for ayat_id in ayat_ids:
+            lexical[ayat_id] = lexical.get(ayat_id, 0) + 1
+    for root in lexicon.get("ar", ()):
+        for ayat_id in arabic.matching(root_pattern(root)):
+            roots[ayat_id] = roots.get(ayat_id, 0) + 1
+    related = related_points(edges, seeds)
+
+    scored = []
+    for ayat_id in (lexical.keys() | roots.keys() | related.keys()) - seeds:
+        evidence = {
+            "lexical": LEXICAL_POINTS * min(lexical.get(ayat_id, 0), MAX_LEXICAL),
+            "root": ROOT_POINTS * min(roots.get(ayat_id, 0), MAX_ROOTS),
+            "related": min(related.get(ayat_id, 0), MAX_RELATED_POINTS),
+        }
+        score = sum(evidence.values())
+        if score >= MIN_SCORE:
+            scored.append((ayat_id, score, "+".join(kind for kind, points in evidence.items() if points)))
+    scored.sort(key=lambda row: (-row[1], row[0]))
+    return scored[:MAX_PER_CONCEPT]
+
+def load_tagging_rows():
+    """The tagging settings and the digests of its inputs; a change to either re-tags"""
+    from import_pipeline import stage_digests
+    settings = [LEXICONS, LEXICAL_POINTS, MAX_LEXICAL, ROOT_POINTS, MAX_ROOTS, sorted(EDGE_POINTS.items()),
+                MAX_RELATED_POINTS, MIN_SCORE, FULL_SCORE, MAX_PER_CONCEPT]
+    return [{"settings": settings, "inputs": stage_digests(TAGGING_INPUTS)}]
+
+def apply_concept_tags(db: Session, rows) -> str:
+    """Replace every generated link; the pipeline commits"""
+    started = time.perf_counter()
+    verses = db.execute(select(Ayat.id, Ayat.translation_2, Ayat.arabic_text)).all()
+    turkish = WordIndex((ayat_id, turkish_words(translation)) for ayat_id, translation, _ in verses)
+    arabic = WordIndex((ayat_id, arabic_words(text)) for ayat_id, _, text in verses)
+    edges = db.execute(select(
+        reference.c.source_ayat_id, reference.c.target_ayat_id, reference.c.reference_type, reference.c.degree,
+    )).all()
+    seeds = {}
+    for ayat_id, concept_id in db.execute(
+        select(ayat_concept.c.ayat_id, ayat_concept.c.concept_id).where(ayat_concept.c.source == "seed")
+    ):
+        seeds.setdefault(concept_id, set()).add(ayat_id)
+
+    links, counts = [], []
+    for concept_id, name in db.execute(select(Concept.id, Concept.name).order_by(Concept.id)):
+        scored = score_concept(LEXICONS.get(name, {}), seeds.get(concept_id, set()), turkish, arabic, edges)
+        links.extend(
+            {"ayat_id": ayat_id, "concept_id": concept_id, "source": source,
+             "confidence": round(min(score / FULL_SCORE, 1.0), 2)}
+            for ayat_id, score, source in scored
+        )
+        counts.append(f"{name} {len(scored)}")
+
+    db.execute(delete(ayat_concept).where(ayat_concept.c.source != "seed"))
+    if links:
+        db.execute(insert(ayat_concept), links)
+
+    return (f"tagged {len(links)} verses for {len(counts)} concepts in "
+            f"{time.perf_counter() - started:.1f}s ({', '.join(counts)})")
+
+def tag_corpus():
+    from import_pipeline import run_pipeline
+    run_pipeline(["concept_tags"], force=True)
+
+if __name__ == "__main__":
+    tag_corpus()
@@ -0,0 +1,46 @@
+"""
+Shared Jinja environment for all routers.
+
+Compiled templates are kept in memory for the life of the process and their
+bytecode is cached on disk, so a restarted worker doesn't recompile them.
+Auto-reload (re-checking template mtimes on every render) is only on in
+development; Railway deployments turn it off.
+"""
+import os
+import tempfile
+import time
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+from compression import static_url
+
+TEMPLATE_DIR = "templates"
+TEMPLATE_CACHE_DIR = os.getenv(
+    "TEMPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "qpus-jinja-cache")
+)
+TEMPLATE_AUTO_RELOAD = os.getenv(
+    "TEMPLATE_AUTO_RELOAD", "0" if os.getenv("RAILWAY_ENVIRONMENT") else "1"
+) == "1"
+
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    auto_reload=TEMPLATE_AUTO_RELOAD,
+    bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+    cache_size=-1,  # never evict compiled templates
+)
+
+# {{ static_url("app.css") }} for long-cached asset URLs
+env.globals["static_url"] = static_url
+
+templates = Jinja2Templates(env=env)
+
+def precompile_templates() -> float:
+    """Load every template once so no request pays for compilation. Returns seconds."""
+    started = time.perf_counter()
+    for name in env.list_templates(extensions=["html"]):
+        env.get_template(name)
+    return time.perf_counter() - started
@@ -0,0 +1,99 @@
+"""
+The translations each user reads.
+
+The catalog of translations is read with one query on first use and again
+after an import, like mushaf.boundaries. A user's selection is the
+"translations" preference (DEFAULT_TRANSLATIONS until they choose), and
+pages load only the ayat_translation rows of the selected translations with
+verse_texts(); the translation columns of Ayat stay deferred. Cached pages
+carry the selected translation ids in their key.
+"""
+import threading
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import Translation, ayat_translation_association as ayat_translation
+from preferences import get_preference, set_preference
+from users import current_user_id
+
+DEFAULT_TRANSLATIONS = ["elmalili", "diyanet"]
+
+class TranslationCatalog:
+    def __init__(self):
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def all(self, db: Session) -> tuple:
+        """(id, key, name) of every translation, in display order"""
+        entries = self._entries
+        if entries is not None:
+            return entries
+        with self._lock:
+            if self._entries is None:
+                self._entries = tuple(db.execute(
+                    select(Translation.id, Translation.key, Translation.name)
+                    .order_by(Translation.position, Translation.id)
+                ).all())
+            return self._entries
+
+    def reset(self):
+        """Read the catalog again on next use (after an import)"""
+        with self._lock:
+            self._entries = None
+
+catalog = TranslationCatalog()
+
+def selected_translations(db: Session, user_id: int) -> tuple:
+    """(id, key, name) of the translations a user reads; db must be the primary"""
+    entries = catalog.all(db)
+    chosen = (get_preference(db, user_id, "translations") or "").split(",")
+    return (
+        tuple(e for e in entries if e.key in chosen)
+        or tuple(e for e in entries if e.key in DEFAULT_TRANSLATIONS)
+        or entries[:1]
+    )
+
+def reader_translations(user_id: int = Depends(current_user_id), db: Session = Depends(get_db)) -> tuple:
+    """Dependency: the selected translations of the request's user"""
+    return selected_translations(db, user_id)
+
+def select_translations(db: Session, user_id: int, keys):
+    """Store a user's selection; committed together with the caller's next commit"""
+    known = {e.key for e in catalog.all(db)}
+    set_preference(db, user_id, "translations", ",".join(key for key in keys if key in known))
+
+def translation_ids(translations) -> tuple:
+    return tuple(t.id for t in translations)
+
+def _texts(db: Session, ayat_ids, translation_ids):
+    """(ayat id, translation id, text) rows, with one query per 500 verses"""
+    ayat_ids = list(dict.fromkeys(ayat_ids))
+    for i in range(0, len(ayat_ids) if translation_ids else 0, 500):
+        yield from db.execute(
+            select(ayat_translation.c.ayat_id, ayat_translation.c.translation_id, ayat_translation.c.text)
+            .where(ayat_translation.c.ayat_id.in_(ayat_ids[i:i + 500]),
+                   ayat_translation.c.translation_id.in_(list(translation_ids)))
+        )
+
+def verse_texts(db: Session, ayat_ids, translations) -> dict:
+    """{ayat id: [(name, text)] in the order of translations}, with one query per 500 verses"""
+    names = {t.id: (position, t.name) for position, t in enumerate(translations)}
+    found = {}
+    for ayat_id, translation_id, text in _texts(db, ayat_ids, names):
+        found.setdefault(ayat_id, []).append((names[translation_id], text))
+    return {ayat_id: [(name, text) for (_, name), text in sorted(rows)] for ayat_id, rows in found.items()}
+
+def keyed_texts(db: Session, ayat_ids, translations) -> dict:
+    """{ayat id: {translation key: text}}, for the JSON API"""
+    keys = {t.id: (position, t.key) for position, t in enumerate(translations)}
+    found = {}
+    for ayat_id, translation_id, text in _texts(db, ayat_ids, keys):
+        found.setdefault(ayat_id, []).append((keys[translation_id], text))
+    return {ayat_id: {key: text for (_, key), text in sorted(rows)} for ayat_id, rows in found.items()}
+
+def first_texts(db: Session, ayat_ids, translations) -> dict:
+    """{ayat id: text} of the first selected translation, for compact verse lists"""
+    return {ayat_id: rows[0][1] for ayat_id, rows in verse_texts(db, ayat_ids, translations[:1]).items()}
@@ -0,0 +1,141 @@
+"""
+User accounts and per-user in-memory state.
+
+A signed-in user is identified by an HMAC-signed cookie, so resolving the
+user of a request needs no query. DEFAULT_USER_ID owns everything stored
+before accounts existed. Until its owner claims it with
+
+    python users.py claim <name>
+
+requests without a valid cookie act as that user, so a single-person
+deployment keeps working without signing in. Once claimed, they are guests
+(user id None): no journal, no stored preferences, and require_user sends
+them to /account. Whether it is claimed is re-read every OWNER_CHECK_SECONDS.
+
+The page cache and the relation index stay shared by all users. Per-user
+state (favorite bitmaps, preferences) lives in PerUserCache: one entry per
+user, the least recently used evicted beyond USER_CACHE_SIZE users and
+loaded again from the database on their next request.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+DEFAULT_USER_ID = 1
+USER_COOKIE = "qpus_user"
+USER_COOKIE_MAX_AGE = 60 * 60 * 24 * 365  # seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1000"))
+OWNER_CHECK_SECONDS = int(os.getenv("OWNER_CHECK_SECONDS", "30"))
+MIN_PASSWORD_LENGTH = 8
+
+# Set SESSION_SECRET in production: with the random fallback, sign-ins end on
+# restart and aren't shared between worker processes
+SESSION_SECRET = (os.getenv("SESSION_SECRET") or secrets.token_hex(32)).encode()
+
+def sign_user(user_id: int) -> str:
+    signature = hmac.new(SESSION_SECRET, str(user_id).encode(), hashlib.sha256).hexdigest()
+    return f"{user_id}.{signature}"
+
+_owner_claimed = {"value": False, "checked": float("-inf")}
+
+def owner_claimed() -> bool:
+    """Whether DEFAULT_USER_ID has a password, read at most every OWNER_CHECK_SECONDS"""
+    if time.monotonic() - _owner_claimed["checked"] >= OWNER_CHECK_SECONDS:
+        from database import engine
+        from sqlalchemy import select
+        from models import User
+        with engine.connect() as conn:
+            claimed = conn.execute(
+                select(User.password_hash.isnot(None)).where(User.id == DEFAULT_USER_ID)
+            ).scalar()
+        _owner_claimed.update(value=bool(claimed), checked=time.monotonic())
+    return _owner_claimed["value"]
+
+def anonymous_user_id() -> Optional[int]:
+    """The user of requests without a valid cookie: DEFAULT_USER_ID while unclaimed, else None (a guest)"""
+    return None if owner_claimed() else DEFAULT_USER_ID
+
+def current_user_id(request: Request) -> Optional[int]:
+    """The signed-in user of a request, anonymous_user_id() without a valid cookie"""
+    user_id, _, signature = request.cookies.get(USER_COOKIE, "").partition(".")
+    if user_id.isdigit() and hmac.compare_digest(sign_user(int(user_id)), f"{user_id}.{signature}"):
+        return int(user_id)
+    return anonymous_user_id()
+
+def require_user(request: Request) -> int:
+    """Dependency for journal pages: the user, guests are sent to sign in"""
+    user_id = current_user_id(request)
+    if user_id is None:
+        raise HTTPException(status_code=303, headers={"Location": "/account"})
+    return user_id
+
+def hash_password(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=2 ** 14, r=8, p=1)
+    return f"{salt.hex()}${digest.hex()}"
+
+def check_password(password: str, stored) -> bool:
+    if not stored:
+        return False  # the default user can't be signed in to
+    salt, _, digest = stored.partition("$")
+    candidate = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=2 ** 14, r=8, p=1)
+    return hmac.compare_digest(candidate.hex(), digest)
+
+class PerUserCache:
+    """factory(user_id) objects for the most recently active users"""
+    def __init__(self, factory, max_users=USER_CACHE_SIZE):
+        self._factory = factory
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                entry = self._entries[user_id] = self._factory(user_id)
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(user_id)
+            return entry
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+def claim_owner(name: str, password: str) -> str:
+    """Give DEFAULT_USER_ID, and so the journal kept before accounts, a name and password"""
+    from database import SessionLocal
+    from models import User
+    if len(password) < MIN_PASSWORD_LENGTH:
+        raise ValueError(f"password must have at least {MIN_PASSWORD_LENGTH} characters")
+    db = SessionLocal()
+    try:
+        if db.query(User.id).filter(User.name == name, User.id != DEFAULT_USER_ID).first():
+            raise ValueError(f"the name {name!r} is taken")
+        owner = db.get(User, DEFAULT_USER_ID)
+        owner.name, owner.password_hash = name, hash_password(password)
+        db.commit()
+    finally:
+        db.close()
+    return (f"user {DEFAULT_USER_ID} is now {name!r}; sign in on /account. Running servers treat "
+            f"visitors without an account as guests within {OWNER_CHECK_SECONDS}s.")
+
+if __name__ == "__main__":
+    import getpass
+    import sys
+
+    if len(sys.argv) != 3 or sys.argv[1] != "claim":
+        sys.exit("Usage: python users.py claim <name>")
+    try:
+        print(claim_owner(sys.argv[2], getpass.getpass("Password: ")))
+    except ValueError as e:
+        sys.exit(str(e))
@@ -1,3 +1,6 @@
+from bisect import bisect_right
+from itertools import accumulate
+
 SURAH_NAMES = {
     1: "Fâtiha", 2: "Bakara", 3: "Âl-i İmrân", 4: "Nisâ", 5: "Mâide",
     6: "En'âm", 7: "A'râf", 8: "Enfâl", 9: "Tevbe", 10: "Yûnus",
@@ -26,3 +29,102 @@ SURAH_NAMES = {
 
 def get_surah_list():
     return [{"number": k, "name": v} for k, v in SURAH_NAMES.items()]
+
+# Verses per surah, for converting between surah:ayat and the absolute verse number (1-6236)
+SURAH_AYAT_COUNTS = [
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109, 123, 111, 43, 52, 99, 128, 111,
+    110, 98, 135, 112, 78, 118, 64, 77, 227, 93, 88, 69, 60, 34, 30, 73, 54, 45,
+    83, 182, 88, 75, 85, 54, 53, 89, 59, 37, 35, 38, 29, 18, 45, 60, 49, 62, 55,
+    78, 96, 29, 22, 24, 13, 14, 11, 11, 18, 12, 12, 30, 52, 52, 44, 28, 28, 20,
+    56, 40, 31, 50, 40, 46, 42, 29, 19, 36, 25, 22, 17, 19, 26, 30, 20, 15, 21,
+    11, 8, 8, 19, 5, 8, 8, 11, 11, 8, 3, 9, 5, 4, 7, 3, 6, 3, 5, 4, 5, 6
+]
+TOTAL_AYATS = sum(SURAH_AYAT_COUNTS)
+
+# Absolute number of the last verse before each surah
+SURAH_OFFSETS = [0] + list(accumulate(SURAH_AYAT_COUNTS))[:-1]
+
+def absolute_number(surah_number, ayat_number):
+    """Convert (surah, ayat) to the absolute verse number, None if out of range"""
+    if not 1 <= surah_number <= 114 or not 1 <= ayat_number <= SURAH_AYAT_COUNTS[surah_number - 1]:
+        return None
+    return SURAH_OFFSETS[surah_number - 1] + ayat_number
+
+def absolute_to_surah_ayat(absolute_num):
+    """Convert absolute ayah number (1-6236) to (surah, ayat)"""
+    surah = bisect_right(SURAH_OFFSETS, absolute_num - 1)
+    return (surah, absolute_num - SURAH_OFFSETS[surah - 1])
+
+# Surahs in order of revelation (the order of the 1924 Cairo edition)
+REVELATION_ORDER = [
+    96, 68, 73, 74, 1, 111, 81, 87, 92, 89, 93, 94, 103, 100, 108, 102, 107, 109, 105, 113,
+    114, 112, 53, 80, 97, 91, 85, 95, 106, 101, 75, 104, 77, 50, 90, 86, 54, 38, 7, 72,
+    36, 25, 35, 19, 20, 56, 26, 27, 28, 17, 10, 11, 12, 15, 6, 37, 31, 34, 39, 40,
+    41, 42, 43, 44, 45, 46, 51, 88, 18, 16, 71, 14, 21, 23, 32, 52, 67, 69, 70, 78,
+    79, 82, 84, 30, 29, 83, 2, 8, 3, 33, 60, 4, 99, 57, 47, 13, 55, 76, 65, 98,
+    59, 24, 22, 63, 58, 49, 66, 64, 61, 62, 48, 5, 9, 110,
+]
+
+# Mekki surah numbers (traditional classification)
+MEKKI_SURAHS = {
+    1, 6, 7, 10, 11, 12, 14, 15, 16, 17, 18, 19, 20, 21, 23, 25, 26, 27, 28, 29,
+    30, 31, 32, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 50, 51, 52,
+    53, 54, 56, 67, 68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82,
+    83, 84, 85, 86, 87, 88, 89, 90, 91, 92, 93, 94, 95, 96, 97, 100, 101, 102,
+    103, 104, 105, 106, 107, 109, 111, 112, 113, 114
+}
+
+# Revelation rank (1-114) of each surah, indexed by surah number - 1
+REVELATION_RANK = [0] * 114
+for rank, surah in enumerate(REVELATION_ORDER, 1):
+    REVELATION_RANK[surah - 1] = rank
+
+# Every verse's absolute number in revelation order (surahs by REVELATION_ORDER,
+# verses in mushaf order within a surah), and each verse's position in it
+CHRONOLOGICAL_ORDER = [
+    SURAH_OFFSETS[surah - 1] + ayat
+    for surah in REVELATION_ORDER
+    for ayat in range(1, SURAH_AYAT_COUNTS[surah - 1] + 1)
+]
+CHRONOLOGICAL_POSITION = [0] * (TOTAL_AYATS + 1)
+for position, number in enumerate(CHRONOLOGICAL_ORDER):
+    CHRONOLOGICAL_POSITION[number] = position
+
+def chronological_neighbors(surah_number, ayat_number):
+    """The (surah, ayat) before and after a verse in revelation order, None at either end"""
+    number = absolute_number(surah_number, ayat_number)
+    if number is None:
+        return None, None
+    position = CHRONOLOGICAL_POSITION[number]
+    previous = absolute_to_surah_ayat(CHRONOLOGICAL_ORDER[position - 1]) if position > 0 else None
+    following = absolute_to_surah_ayat(CHRONOLOGICAL_ORDER[position + 1]) if position + 1 < TOTAL_AYATS else None
+    return previous, following
+
+# First verse of each juz (the standard 30 parts)
+JUZ_STARTS = [
+    (1, 1), (2, 142), (2, 253), (3, 93), (4, 24), (4, 148), (5, 82), (6, 111), (7, 88), (8, 41),
+    (9, 93), (11, 6), (12, 53), (15, 1), (17, 1), (18, 75), (21, 1), (23, 1), (25, 21), (27, 56),
+    (29, 46), (33, 31), (36, 28), (39, 32), (41, 47), (46, 1), (51, 31), (58, 1), (67, 1), (78, 1),
+]
+JUZ_START_NUMBERS = [absolute_number(surah, ayat) for surah, ayat in JUZ_STARTS]
+
+def juz_of(absolute_num):
+    """The juz (1-30) holding an absolute verse number"""
+    return bisect_right(JUZ_START_NUMBERS, absolute_num)
+
+def surah_sections(ayats):
+    """Group verses listed across surahs into consecutive per-surah sections"""
+    sections = []
+    for ayat in ayats:
+        if not sections or sections[-1]["surah"] != ayat.surah_number:
+            sections.append({
+                "surah": ayat.surah_number,
+                "name": SURAH_NAMES.get(ayat.surah_number),
+                "rank": REVELATION_RANK[ayat.surah_number - 1],
+                # The surah's classification, not that of the verses on this page;
+                # Medeni exceptions are flagged only inside Mekki surahs
+                "mekki": ayat.surah_number in MEKKI_SURAHS,
+                "ayats": [],
+            })
+        sections[-1]["ayats"].append(ayat)
+    return sections
@@ -0,0 +1,77 @@
+"""
+Surah page views, counted in memory and written in batches.
+
+A surah view only adds one to a dict; a background thread writes the counts
+gathered since the last flush every VISIT_FLUSH_SECONDS with one executemany
+upsert (visits + n), and shutdown writes the rest. Each process flushes its
+own counts, so replicas add up. Counts of a process that dies unflushed are
+lost, which the pre-rendering they rank can afford.
+"""
+import os
+import threading
+import traceback
+
+from sqlalchemy import func
+
+from database import IS_SQLITE, SessionLocal
+from models import SurahVisit
+
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert
+else:
+    from sqlalchemy.dialects.postgresql import insert
+
+VISIT_FLUSH_SECONDS = int(os.getenv("VISIT_FLUSH_SECONDS", "60"))
+
+class VisitCounter:
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def record(self, surah_number: int):
+        with self._lock:
+            self._pending[surah_number] = self._pending.get(surah_number, 0) + 1
+
+    def flush(self):
+        """Write the counts gathered since the last flush; kept for the next one if the write fails"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        statement = insert(SurahVisit)
+        statement = statement.on_conflict_do_update(
+            index_elements=["surah_number"],
+            set_={"visits": SurahVisit.visits + statement.excluded.visits, "last_visited_at": func.now()},
+        )
+        db = SessionLocal()
+        try:
+            db.execute(statement, [{"surah_number": s, "visits": n} for s, n in sorted(pending.items())])
+            db.commit()
+        except Exception:
+            with self._lock:
+                for surah_number, n in pending.items():
+                    self._pending[surah_number] = self._pending.get(surah_number, 0) + n
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopped.wait(VISIT_FLUSH_SECONDS):
+            try:
+                self.flush()
+            except Exception:
+                traceback.print_exc()  # a busy database; try again on the next flush
+
+    def start(self):
+        self._stopped.clear()
+        threading.Thread(target=self._run, name="qpus-visit-flush", daemon=True).start()
+
+    def shutdown(self):
+        self._stopped.set()
+        try:
+            self.flush()
+        except Exception:
+            traceback.print_exc()
+
+visits = VisitCounter()
@@ -0,0 +1,69 @@
+"""
+Startup warm-up, so the first visitors after a deploy don't get cold pages.
+
+prepare() configures the SQLAlchemy mappers and compiles every template
+before the app takes traffic. prerender_surahs() runs as a background job
+after the import: it renders the most visited surahs into the page cache,
+which also pulls their rows into the database's page cache.
+"""
+import os
+import time
+
+from sqlalchemy.orm import configure_mappers
+
+from database import SessionLocal, ReadSessionLocal
+from models import SurahVisit, UserPreference
+from templating import precompile_templates
+from users import DEFAULT_USER_ID, anonymous_user_id
+from utils import SURAH_NAMES
+
+# How many surahs to pre-render (0 disables)
+WARMUP_SURAHS = int(os.getenv("WARMUP_SURAHS", "10"))
+
+# Used when there are not enough visits recorded yet
+DEFAULT_SURAHS = [1, 36, 18, 67, 112, 2, 55, 56, 113, 114]
+
+def prepare() -> dict:
+    """Configure mappers and compile templates. Returns the timings in ms."""
+    started = time.perf_counter()
+    configure_mappers()
+    mappers_ms = (time.perf_counter() - started) * 1000
+    templates_ms = precompile_templates() * 1000
+    return {"mappers_ms": round(mappers_ms), "templates_ms": round(templates_ms)}
+
+def top_surahs(db, limit=WARMUP_SURAHS) -> list:
+    """Last read surah first, then the most visited, topped up with DEFAULT_SURAHS"""
+    last_read = db.query(UserPreference.value).filter(
+        UserPreference.user_id == DEFAULT_USER_ID, UserPreference.key == "last_read_surah"
+    ).scalar()
+    visited = [
+        surah for (surah,) in db.query(SurahVisit.surah_number)
+        .order_by(SurahVisit.visits.desc(), SurahVisit.surah_number)
+        .limit(limit)
+    ]
+    candidates = ([int(last_read)] if last_read and last_read.isdigit() else []) + visited + DEFAULT_SURAHS
+    return [surah for surah in dict.fromkeys(candidates) if surah in SURAH_NAMES][:limit]
+
+def prerender_surahs(report=None, limit=WARMUP_SURAHS) -> str:
+    """Render the top surahs into the page cache (a background job)"""
+    from routers.web_routes import surah_page
+    from translations import selected_translations
+
+    started = time.perf_counter()
+    db = ReadSessionLocal()
+    user_db = SessionLocal()
+    try:
+        surahs = top_surahs(user_db, limit)
+        # Pages as seen by visitors without an account
+        visitor = anonymous_user_id()
+        for i, surah in enumerate(surahs, 1):
+            surah_page(db, user_db, visitor, surah, selected_translations(user_db, visitor))
+            if report:
+                report(100 * i // len(surahs), f"surah {surah}")
+    finally:
+        db.close()
+        user_db.close()
+
+    summary = f"pre-rendered {len(surahs)} surahs in {(time.perf_counter() - started) * 1000:.0f} ms"
+    print(f"Warm-up: {summary}")
+    return summary